@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import records
+
+_game = None
+
+
+def iter_games(directory):
+    """Yield (file name, index, record) for every game in the directory's record and SGF files."""
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        if name.endswith(".sgf"):
+            with open(path) as f:
+                chunks = f.read().split("(;")[1:]
+            for i, chunk in enumerate(chunks):
+                yield name, i, records.from_sgf("(;" + chunk)
+            continue
+        try:
+            for i, record in enumerate(records.read_records(path)):
+                yield name, i, record
+        except ValueError:
+            continue
+
+
+def iter_positions(directory):
+    for name, index, record in iter_games(directory):
+        for ply in range(len(record.moves)):
+            yield name, index, record.board_size, record.rules, record.moves[:ply], record.moves[ply]
+
+
+def _init_worker(difficulty):
+    global _game
+    import headless
+    _game = headless.new_game(difficulty=difficulty)
+
+
+def annotate_position(size, moves, played, threshold, rules="standard"):
+    """Score the position before `played` with the engine under the game's rules; scores are for the side to move."""
+    import gomoku8
+    import headless
+
+    if size != gomoku8.BOARD_SIZE:
+        return None
+    _game.rules = rules
+    game = headless.load_position(_game, moves)
+    side = gomoku8.PLAYER if len(moves) % 2 == 0 else gomoku8.AI
+    sign = 1 if side == gomoku8.AI else -1
+    scored = {move: score * sign for move, score in game.search(side)}
+    if not scored:
+        return None
+    best = max(scored, key=scored.get)
+    played = tuple(played)
+    if played not in scored:
+        # search_depth is None when the budget ran out during depth 0, whose partial scores are static
+        depth = game.search_depth or 0
+        game.make_move(played[0], played[1], side, animate=False)
+        scored[played] = game.minimax(depth, float('-inf'), float('inf'), side == gomoku8.PLAYER) * sign
+        game.undo_move(played[0], played[1])
+    loss = scored[best] - scored[played]
+    return {
+        "side": side,
+        "move": list(played),
+        "best": list(best),
+        "score": scored[best],
+        "played_score": scored[played],
+        "loss": loss,
+        "blunder": loss >= threshold,
+    }
+
+
+def annotate(directory, output, workers=None, difficulty="Hard", threshold=500, window=None, log=sys.stderr):
+    """Annotate every position under directory, streaming JSON lines to output as they finish."""
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    positions = iter_positions(directory)
+    done = 0
+    start = time.time()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(difficulty,)) as pool:
+        pending = {}
+
+        def submit():
+            # Keep a bounded number of positions in flight so huge inputs stream
+            while len(pending) < window:
+                try:
+                    name, index, size, rules, moves, played = next(positions)
+                except StopIteration:
+                    return
+                future = pool.submit(annotate_position, size, moves, played, threshold, rules)
+                pending[future] = {"file": name, "game": index, "ply": len(moves)}
+
+        submit()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                row = pending.pop(future)
+                result = future.result()
+                if result is not None:
+                    row.update(result)
+                    output.write(json.dumps(row) + "\n")
+                done += 1
+            output.flush()
+            submit()
+    elapsed = time.time() - start
+    rate = done / elapsed if elapsed else 0.0
+    if log:
+        print(f"{done} positions in {elapsed:.1f}s ({rate:.1f} positions/s, {workers} workers)", file=log)
+    return done, rate
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Annotate recorded games with engine scores and blunders")
+    parser.add_argument("directory", help="directory of record files (see records.py) and .sgf files")
+    parser.add_argument("-o", "--output", help="JSON lines output (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--difficulty", default="Hard", help="difficulty profile to search with")
+    parser.add_argument("--threshold", type=int, default=500, help="score loss that counts as a blunder")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "a") as out:
+            annotate(args.directory, out, args.workers, args.difficulty, args.threshold)
+    else:
+        annotate(args.directory, sys.stdout, args.workers, args.difficulty, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
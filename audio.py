@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pygame
+
+# Shortest gap between two plays of the same sound, in seconds
+MIN_INTERVAL = 0.05
+
+
+class AudioDispatcher:
+    """Sound effects played in response to game events, on a fixed pool of mixer channels.
+
+    Game code calls emit(event) when something happens, and dispatch(), once
+    per frame, plays what was emitted since the last one. An event's sound
+    emitted several times in one frame plays once, a sound played less than
+    its interval ago is dropped, and when every channel is busy the one that
+    started first is cut off. Until start() has loaded the sounds, or if
+    loading failed, emit() and dispatch() do nothing.
+    """
+
+    def __init__(self, files, events, channels=4, intervals=None, enabled=True, threaded=True):
+        self.files = files
+        self.events = events
+        self.channel_count = channels
+        self.intervals = intervals or {}
+        self.enabled = enabled
+        self.threaded = threaded
+        self.sounds = {}
+        self.channels = []
+        self.channel_started = []
+        self.last_played = {}
+        self.pending = []
+        self.thread = None
+        self.started = False
+        self.load_seconds = None
+        self.stats = {"emitted": 0, "played": 0, "merged": 0, "throttled": 0, "stolen": 0}
+
+    def start(self):
+        """Load the sounds, on a background thread if threaded; later calls do nothing."""
+        if self.started or not self.enabled:
+            return
+        self.started = True
+        if self.threaded:
+            self.thread = threading.Thread(target=self.load, name="sound-loader", daemon=True)
+            self.thread.start()
+        else:
+            self.load()
+
+    def load(self):
+        load_start = time.perf_counter()
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_num_channels(self.channel_count)
+            channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+            sounds = {name: pygame.mixer.Sound(path) for name, path in self.files.items()}
+        except Exception:
+            print("Warning: Sound initialization failed")
+        else:
+            self.channels = channels
+            self.channel_started = [0.0] * len(channels)
+            # Set last: emit() only looks at sounds
+            self.sounds = sounds
+        self.load_seconds = time.perf_counter() - load_start
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def emit(self, event):
+        name = self.events.get(event)
+        if name not in self.sounds:
+            return
+        self.stats["emitted"] += 1
+        if name in self.pending:
+            self.stats["merged"] += 1
+        else:
+            self.pending.append(name)
+
+    def dispatch(self, now=None):
+        if not self.pending:
+            return
+        now = time.perf_counter() if now is None else now
+        for name in self.pending:
+            last = self.last_played.get(name)
+            if last is not None and now - last < self.intervals.get(name, MIN_INTERVAL):
+                self.stats["throttled"] += 1
+                continue
+            self.play(name, now)
+        self.pending.clear()
+
+    def play(self, name, now):
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                break
+        else:
+            i = min(range(len(self.channels)), key=self.channel_started.__getitem__)
+            self.stats["stolen"] += 1
+        self.channels[i].play(self.sounds[name])
+        self.channel_started[i] = now
+        self.last_played[name] = now
+        self.stats["played"] += 1
@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Board and markers, kept in sync with gomoku7.py / gomoku8.py
+BOARD_SIZE = 10
+PLAYER = 'X'
+AI = 'O'
+
+_game = None
+
+
+def _init_worker(difficulty, cache_bytes):
+    global _game
+    import headless
+    import search_cache
+    import gomoku8
+    _game = headless.new_game(difficulty=difficulty,
+                              cache=search_cache.SearchCache(cache_bytes, gomoku8.BOARD_SIZE))
+
+
+def check_position(moves, size=BOARD_SIZE):
+    """Raise ValueError unless moves are distinct (x, y) pairs on the board."""
+    seen = set()
+    for i, move in enumerate(moves):
+        if len(move) != 2 or not all(isinstance(v, int) for v in move):
+            raise ValueError(f"move {i + 1} is not an x, y pair: {move!r}")
+        if not (0 <= move[0] < size and 0 <= move[1] < size):
+            raise ValueError(f"move {i + 1} is off the board: {move[0]},{move[1]}")
+        if tuple(move) in seen:
+            raise ValueError(f"move {i + 1} is on an occupied point: {move[0]},{move[1]}")
+        seen.add(tuple(move))
+
+
+def best_move(game, moves):
+    """Best move, score and principal variation for the side to move after moves.
+
+    Scores are from the side to move's point of view. The game is reused
+    between calls, so its search cache carries over to later positions.
+    """
+    import headless
+
+    check_position(moves, len(game.board))
+    headless.load_position(game, moves)
+    side = PLAYER if len(moves) % 2 == 0 else AI
+    sign = 1 if side == AI else -1
+    scored = [(move, score * sign) for move, score in game.search(side)]
+    if not scored:
+        return {"best": None, "score": None, "pv": []}
+    move, score = max(scored, key=lambda item: item[1])
+    pv = game.principal_variation(move, side)
+    return {"best": list(move), "score": score, "pv": [list(m) for m in pv]}
+
+
+def _run_chunk(chunk):
+    results = []
+    for index, moves in chunk:
+        try:
+            if isinstance(moves, Exception):
+                raise moves
+            results.append((index, best_move(_game, moves)))
+        except (ValueError, TypeError) as exc:
+            results.append((index, {"best": None, "score": None, "pv": [], "error": str(exc)}))
+    return results
+
+
+def _chunks(positions, size):
+    chunk = []
+    for item in enumerate(positions):
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze(positions, difficulty="Medium", workers=None, chunk_size=8, cache_bytes=64 * 1024 * 1024):
+    """Yield (index, result) for each position (a list of moves, player first) as it completes.
+
+    An invalid position, or a ValueError in its place, gets a result with
+    an "error" message instead of stopping the run.
+
+    Positions are sent to a process pool in chunks to amortize the
+    round trip, and each worker keeps one game and search cache for its
+    whole lifetime. workers=0 searches in this process instead.
+    """
+    if workers == 0:
+        _init_worker(difficulty, cache_bytes)
+        for chunk in _chunks(positions, chunk_size):
+            yield from _run_chunk(chunk)
+        return
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(positions, chunk_size)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(difficulty, cache_bytes)) as pool:
+        pending = set()
+        while True:
+            # A few chunks per worker in flight keeps cores busy without reading all input up front
+            for chunk in chunks:
+                pending.add(pool.submit(_run_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield from future.result()
+
+
+def read_positions(lines):
+    """Positions as JSON move lists or "x,y x,y" text, one per line; a ValueError for a line that does not parse."""
+    import headless
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield [tuple(m) for m in json.loads(line)] if line.startswith("[") else headless.parse_moves(line)
+        except (ValueError, TypeError) as exc:
+            yield ValueError(f"line {number}: {exc}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Best moves for many positions at once")
+    parser.add_argument("positions", help='file with one position per line: "x,y x,y ..." or a JSON move list, player first ("-" for stdin)')
+    parser.add_argument("-o", "--output", help="JSON lines output (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes, 0 for in-process (default: all cores)")
+    parser.add_argument("--difficulty", default="Medium")
+    parser.add_argument("--chunk-size", type=int, default=8, help="positions per worker task")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.positions == "-" else open(args.positions)
+    out = open(args.output, "w") if args.output else sys.stdout
+    count = 0
+    start = time.time()
+    try:
+        for index, result in analyze(read_positions(source), args.difficulty, args.workers, args.chunk_size):
+            out.write(json.dumps({"index": index, **result}) + "\n")
+            out.flush()
+            count += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.time() - start
+    print(f"{count} positions in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f}/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
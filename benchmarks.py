@@ -0,0 +1,447 @@
+import argparse
+import random
+import time
+
+import headless
+
+# A mid-game position used by the rendering benchmarks
+MIDGAME = "4,4 5,5 4,5 3,3 4,6 4,3 5,6 6,6 3,5 2,4 6,4 7,3 5,3 6,2 3,6 2,7"
+
+# Tactical positions, AI to move, for the search benchmarks
+TACTICS = {
+    "win": "1,1 6,2 1,2 6,3 1,4 6,4 1,7 6,5 3,3",
+    "block-four": "2,2 2,1 2,3 6,6 2,4 7,2 2,5",
+    "open-three": "4,3 6,6 4,4 7,7 4,5",
+    "counter-four": "4,3 7,2 4,4 7,3 4,5 7,4 0,0",
+    "four-three": "0,0 3,3 0,9 3,4 9,0 3,5 9,9 4,6 0,5 5,6 3,2",
+    "stop-four-three": "3,3 3,2 3,4 0,0 3,5 0,9 4,6 9,0 5,6 9,5 9,9",
+    "quiet": MIDGAME + " 8,8",
+}
+
+
+def bench_render(frames=300):
+    """CPU time per frame for full redraws versus dirty rectangles."""
+    import pygame
+    import gomoku8
+
+    results = {}
+    for dirty in (False, True):
+        game = headless.new_game(headless.parse_moves(MIDGAME))
+        game.drawn = None
+        cpu_start = time.process_time()
+        for frame in range(frames):
+            # Sweep the hover cell and drop an animated stone now and then
+            game.update_hover((gomoku8.MARGIN_LEFT + (frame // 10 % 10) * gomoku8.CELL_SIZE, gomoku8.MARGIN_TOP))
+            if frame % 100 == 50:
+                x, y = 8, frame // 100
+                game.make_move(x, y, gomoku8.PLAYER if len(game.stones) % 2 == 0 else gomoku8.AI)
+            rects = game.draw_board(dirty)
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+        results["dirty" if dirty else "full"] = (time.process_time() - cpu_start) / frames * 1000
+    return [f"render {mode}: {ms:.2f} ms CPU/frame" for mode, ms in results.items()]
+
+
+def bench_stones(frames=200):
+    """Time to draw the stone layer of a crowded board."""
+    import gomoku8
+
+    moves = [(x, y) for x in range(gomoku8.BOARD_SIZE) for y in range(gomoku8.BOARD_SIZE) if (x * 3 + y) % 4]
+    game = headless.new_game(moves[:80])
+    game.draw_stones()
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.draw_stones()
+    elapsed = (time.perf_counter() - start) / frames * 1000
+    return [f"stones ({len(game.stones)}): {elapsed:.2f} ms/frame"]
+
+
+def bench_menu(frames=200):
+    """CPU time per menu frame."""
+    import pygame
+    import gomoku8
+
+    manager = gomoku8.GameManager()
+    manager.draw_menu()
+    cpu_start = time.process_time()
+    for _ in range(frames):
+        manager.draw_menu()
+        pygame.display.flip()
+    return [f"menu: {(time.process_time() - cpu_start) / frames * 1000:.2f} ms CPU/frame"]
+
+
+def bench_idle(seconds=3.0):
+    """CPU share of one core while the board sits idle, fixed 60 FPS versus adaptive."""
+    import asyncio
+    import gomoku8
+
+    lines = []
+    for adaptive in (False, True):
+        manager = gomoku8.GameManager()
+        manager.state = "playing"
+        manager.game = gomoku8.Gomoku(manager.search_cache)
+        manager.game.show_difficulty_modal = False
+        manager.adaptive_frames = adaptive
+        for recent_input in (True, False):
+            manager.last_input = time.time() if recent_input else 0.0
+            wall_start, cpu_start = time.time(), time.process_time()
+            asyncio.run(gomoku8.run(manager, seconds))
+            share = (time.process_time() - cpu_start) / (time.time() - wall_start) * 100
+            mode = "adaptive" if adaptive else "fixed"
+            state = "ambient" if recent_input else "idle"
+            lines.append(f"idle {mode} ({state}): {share:.1f}% CPU")
+            if not adaptive:
+                break
+    return lines
+
+
+def bench_eval(turns=3, calls=20000):
+    """Cost of one static evaluation and search time per AI turn."""
+    import gomoku8
+    import search_cache
+
+    lines = []
+    for difficulty in ("Medium", "Hard"):
+        game = headless.new_game(headless.parse_moves(MIDGAME), difficulty, search_cache.SearchCache())
+        start = time.perf_counter()
+        for _ in range(calls):
+            game.evaluate()
+        per_call = (time.perf_counter() - start) / calls * 1e6
+        start = time.perf_counter()
+        for _ in range(turns):
+            # Alternate sides along the engine's own line so each turn is a new position
+            side = gomoku8.PLAYER if len(game.stones) % 2 == 0 else gomoku8.AI
+            scored = game.score_moves(side, depth=2)
+            pick = max if side == gomoku8.AI else min
+            x, y = pick(scored, key=lambda item: item[1])[0]
+            game.make_move(x, y, side, animate=False)
+        ms = (time.perf_counter() - start) / turns * 1000
+        lines.append(f"eval {difficulty}: {per_call:.2f} us/evaluation, {ms:.0f} ms/turn")
+    return lines
+
+
+def bench_windows(sizes=(10, 15, 19)):
+    """Build time and memory of the window index tables per board size."""
+    import board
+
+    lines = []
+    for size in sizes:
+        table = board.WindowTable(size)
+        lines.append(f"windows {size}x{size}: {len(table.windows)} windows, built in "
+                     f"{table.build_seconds * 1000:.1f} ms, {table.memory_bytes() / 1024:.0f} KiB")
+    return lines
+
+
+def bench_tactics(difficulty="Medium"):
+    """Branching factor and search time on TACTICS with and without forcing-move pruning."""
+    import search_cache
+
+    lines = []
+    for name, moves in TACTICS.items():
+        results = {}
+        for forcing in (False, True):
+            game = headless.new_game(headless.parse_moves(moves), difficulty, search_cache.SearchCache())
+            game.forcing_moves = forcing
+            counts = [0, 0]
+            candidates = game.get_candidate_moves
+
+            def counted(side, width=0, **kwargs):
+                result = candidates(side, width, **kwargs)
+                counts[0] += 1
+                counts[1] += len(result)
+                return result
+            game.get_candidate_moves = counted
+            start = time.perf_counter()
+            game.score_moves(depth=2)
+            results[forcing] = (counts[1] / counts[0], (time.perf_counter() - start) * 1000)
+        (off_branch, off_ms), (on_branch, on_ms) = results[False], results[True]
+        lines.append(f"tactics {name}: branching {off_branch:.1f} -> {on_branch:.1f}, "
+                     f"{off_ms:.0f} -> {on_ms:.0f} ms")
+    return lines
+
+
+def bench_profiles():
+    """Nodes, depth reached and time per move for each difficulty profile on TACTICS."""
+    import gomoku8
+
+    lines = []
+    for difficulty, profile in gomoku8.DIFFICULTY_LEVELS.items():
+        runs = []
+        for moves in TACTICS.values():
+            game = headless.new_game(headless.parse_moves(moves), difficulty)
+            game.search()
+            runs.append(game.search_stats)
+        worst = max(run["seconds"] for run in runs) * 1000
+        lines.append(f"profile {difficulty}: budget {profile['nodes']} nodes/{profile['time']:.1f}s, "
+                     f"max {max(run['nodes'] for run in runs)} nodes, depth {min(run['depth'] for run in runs)}-"
+                     f"{max(run['depth'] for run in runs)}, worst {worst:.0f} ms")
+    return lines
+
+
+def bench_rules(difficulties=("Medium", "Hard")):
+    """Forbidden-point checks and time per move on TACTICS under each rule variant."""
+    import gomoku8
+    import rules
+
+    game = headless.new_game(headless.parse_moves(MIDGAME))
+    empties = game.grid.empties()
+    lines = []
+    for label, check in (("direct", lambda idx: rules.is_forbidden(game.grid, idx)),
+                         ("tracked", game.forbidden.is_forbidden)):
+        start = time.perf_counter()
+        for _ in range(20):
+            for idx in empties:
+                check(idx)
+        us = (time.perf_counter() - start) / (20 * len(empties)) * 1e6
+        lines.append(f"rules forbidden check {label}: {us:.2f} us/point")
+    for variant in rules.RULES:
+        for difficulty in difficulties:
+            budget = gomoku8.DIFFICULTY_LEVELS[difficulty]["time"]
+            runs = []
+            for moves in TACTICS.values():
+                game = headless.new_game(headless.parse_moves(moves), difficulty)
+                game.rules = variant
+                game.search()
+                runs.append(game.search_stats)
+            worst = max(run["seconds"] for run in runs)
+            rate = sum(run["nodes"] for run in runs) / sum(run["seconds"] for run in runs)
+            lines.append(f"rules {variant} {difficulty}: {rate:.0f} nodes/s, worst {worst * 1000:.0f} ms "
+                         f"of a {budget:.1f}s budget")
+    return lines
+
+
+def bench_quiescence(difficulty="Medium", reference_depth=3):
+    """How often a 1-ply search agrees with a deeper one without quiescence on TACTICS, with and without it."""
+    import gomoku8
+
+    profile = gomoku8.DIFFICULTY_LEVELS[difficulty]
+    saved = dict(profile)
+
+    def best(moves, depth, nodes):
+        profile["quiescence_nodes"] = nodes
+        game = headless.new_game(headless.parse_moves(moves), difficulty)
+        side = gomoku8.PLAYER if len(game.stones) % 2 == 0 else gomoku8.AI
+        random.seed(0)
+        start = time.perf_counter()
+        scored = game.score_moves(side, depth)
+        pick = max if side == gomoku8.AI else min
+        return pick(scored, key=lambda item: item[1]), (time.perf_counter() - start) * 1000
+
+    lines = []
+    try:
+        profile.update(eval_jitter=0, move_jitter=0)
+        reference = {name: best(moves, reference_depth, 0)[0] for name, moves in TACTICS.items()}
+        for nodes in (0, saved["quiescence_nodes"] or 32):
+            agree, total_ms = 0, 0.0
+            for name, moves in TACTICS.items():
+                (move, score), ms = best(moves, 0, nodes)
+                agree += move == reference[name][0]
+                total_ms += ms
+            label = f"{nodes} nodes" if nodes else "off"
+            lines.append(f"quiescence {label}: 1-ply agrees with {reference_depth + 1}-ply plain search on "
+                         f"{agree}/{len(TACTICS)}, {total_ms / len(TACTICS):.0f} ms/position")
+    finally:
+        profile.clear()
+        profile.update(saved)
+    return lines
+
+
+def bench_selective(difficulty="Hard", depth=4, positions=("quiet", "open-three", "four-three"), repeats=3):
+    """Nodes to reach depth, agreement with plain alpha-beta and best-of-repeats time, per selectivity option, under freestyle."""
+    import gomoku8
+    import rules
+
+    profile = gomoku8.DIFFICULTY_LEVELS[difficulty]
+    saved = dict(profile)
+    configs = {"plain": (False, False), "lmr": (True, False), "null-move": (False, True), "both": (True, True)}
+    lines = []
+    reference = {}
+    try:
+        profile.update(depth=depth, nodes=10 ** 9, time=10 ** 9, move_jitter=0)
+        for label, (lmr, null_move) in configs.items():
+            profile.update(lmr=lmr, null_move=null_move)
+            nodes, solved, seconds = 0, 0, 0.0
+            for name in positions:
+                times = []
+                for _ in range(repeats):
+                    game = headless.new_game(headless.parse_moves(TACTICS[name]), difficulty)
+                    # Null-move pruning is only sound, and only used, under freestyle
+                    game.rules = rules.FREESTYLE
+                    random.seed(0)
+                    scored = game.search()
+                    times.append(game.search_stats["seconds"])
+                nodes += game.search_stats["iterations"][-1][1]
+                seconds += min(times)
+                best = scored[0]
+                reference.setdefault(name, best)
+                solved += best[0] == reference[name][0] or best[1] == reference[name][1]
+            lines.append(f"selective {label}: {nodes / len(positions):.0f} nodes to depth {depth}, "
+                         f"{solved}/{len(positions)} agree with plain, {seconds / len(positions) * 1000:.0f} ms")
+    finally:
+        profile.clear()
+        profile.update(saved)
+    return lines
+
+
+# How far past SEARCH_SLICE a slice may run before its next budget check, in seconds
+SLICE_MARGIN = 0.002
+
+
+def bench_slices(difficulties=("Medium", "Hard")):
+    """gomoku7's cooperative AI move: longest time the event loop waits, against one blocking search.
+
+    The loop wait is wall-clock time and only reported, since other work on
+    the machine stretches it; the longest slice is checked in CPU time.
+    """
+    import asyncio
+    import random
+    import gomoku7
+
+    async def sliced(game):
+        gaps = []
+        done = False
+
+        async def ticker():
+            last = time.perf_counter()
+            while not done:
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.ensure_future(ticker())
+        await game.ai_move_async()
+        done = True
+        await task
+        return max(gaps)
+
+    lines = []
+    for difficulty in difficulties:
+        for name in ("open-three", "quiet"):
+            results = []
+            for cooperative in (False, True):
+                game = gomoku7.Gomoku()
+                game.difficulty = difficulty
+                for i, (x, y) in enumerate(headless.parse_moves(TACTICS[name])):
+                    game.make_move(x, y, gomoku7.PLAYER if i % 2 == 0 else gomoku7.AI, animate=False)
+                random.seed(0)
+                start = time.perf_counter()
+                gap = asyncio.run(sliced(game)) if cooperative else None
+                if not cooperative:
+                    game.ai_move()
+                results.append((time.perf_counter() - start, gap, game.last_move[:2], game))
+            (blocking, _, move, _), (total, gap, sliced_move, game) = results
+            longest = game.longest_slice_cpu
+            lines.append(f"slices {difficulty} {name}: blocking {blocking * 1000:.0f} ms; sliced {total * 1000:.0f} ms in "
+                         f"{game.slices} slices, longest slice {longest * 1000:.1f} ms CPU, "
+                         f"longest loop wait {gap * 1000:.1f} ms, same move: {move == sliced_move}")
+            assert longest <= gomoku7.SEARCH_SLICE + SLICE_MARGIN, f"{difficulty} {name}: slice took {longest * 1000:.1f} ms"
+            assert move == sliced_move, f"{difficulty} {name}: sliced search chose {sliced_move}, blocking {move}"
+    return lines
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import pygame
+pygame_done = time.perf_counter()
+import asyncio
+import gomoku8
+imported = time.perf_counter()
+manager = gomoku8.GameManager()
+asyncio.run(gomoku8.run(manager, duration=0))
+first_frame = time.perf_counter()
+gomoku8.audio.wait()
+print(pygame_done - start, imported - start, first_frame - start, gomoku8.audio.load_seconds or 0.0)
+"""
+
+
+def bench_startup(runs=5):
+    """Import time and time to the first menu frame in a fresh interpreter, and the background sound load."""
+    import statistics
+    import subprocess
+    import sys
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True)
+        samples.append([float(value) for value in output.stdout.split()[-4:]])
+    pygame_import, game_import, first_frame, sound_load = (statistics.median(column) for column in zip(*samples))
+    return [f"startup: import pygame {pygame_import * 1000:.0f} ms, import gomoku8 {game_import * 1000:.0f} ms, "
+            f"first frame {first_frame * 1000:.0f} ms (median of {runs})",
+            f"startup: sound load {sound_load * 1000:.0f} ms, on a background thread after the first frame"]
+
+
+def bench_audio(modal_frames=120, burst=50):
+    """Sound plays during an AI turn and while the end-of-game modal shows, and a burst of stone events."""
+    import gomoku8
+
+    audio = gomoku8.audio
+    audio.start()
+    audio.wait()
+    if not audio.sounds:
+        return ["audio: no mixer, skipped"]
+    lines = []
+    game = headless.new_game(headless.parse_moves(TACTICS["open-three"]))
+    before = audio.stats["played"]
+    game.ai_move()
+    audio.dispatch()
+    lines.append(f"audio AI turn: {game.nodes} nodes searched, {audio.stats['played'] - before} sound played")
+
+    game = headless.new_game(headless.parse_moves(TACTICS["win"]))
+    game.ai_move()
+    audio.dispatch()
+    before = audio.stats["played"]
+    for _ in range(modal_frames):
+        game.draw_board()
+        audio.dispatch()
+    lines.append(f"audio modal: {audio.stats['played'] - before} sounds over {modal_frames} frames of the {game.game_state} modal")
+
+    stats = dict(audio.stats)
+    start = time.perf_counter()
+    for i in range(burst):
+        audio.emit("stone_placed")
+        audio.emit("stone_placed")
+        audio.dispatch(start + i * 0.01)
+    elapsed = (time.perf_counter() - start) / burst * 1e6
+    counts = {key: audio.stats[key] - stats[key] for key in stats}
+    lines.append(f"audio burst: {counts['emitted']} events every 10 ms -> {counts['played']} played, "
+                 f"{counts['merged']} merged, {counts['throttled']} throttled, {counts['stolen']} channels stolen; "
+                 f"{elapsed:.0f} us per frame")
+    return lines
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "render": bench_render,
+    "stones": bench_stones,
+    "menu": bench_menu,
+    "idle": bench_idle,
+    "eval": bench_eval,
+    "windows": bench_windows,
+    "tactics": bench_tactics,
+    "profiles": bench_profiles,
+    "quiescence": bench_quiescence,
+    "rules": bench_rules,
+    "slices": bench_slices,
+    "audio": bench_audio,
+    "selective": bench_selective,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gomoku performance benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        for line in BENCHMARKS[name]():
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
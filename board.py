@@ -0,0 +1,173 @@
+import sys
+import time
+
+# Cell codes; markers match gomoku7.py / gomoku8.py ('.', 'X', 'O')
+EMPTY = 0
+BORDER = 3
+CODES = {'.': 0, 'X': 1, 'O': 2}
+MARKERS = ".XO#"
+PAD = 4
+
+
+class Board:
+    """Square board in one bytearray, surrounded by PAD cells of BORDER.
+
+    Cell (x, y) lives at (x + PAD) * stride + y + PAD, so a direction is a
+    constant step and a line scan stops at the border like at any other
+    cell that is not the colour being counted: no bounds checks. The border
+    is as wide as a window of five, so fixed-length reads from a board cell
+    stay inside the array too. Copying is one bytearray copy, and cells may
+    be any writable buffer, e.g. a memoryview over shared memory.
+    """
+
+    __slots__ = ("size", "stride", "cells", "steps", "around", "playable")
+
+    def __init__(self, size, cells=None):
+        self.size = size
+        self.stride = stride = size + 2 * PAD
+        if cells is None:
+            cells = bytearray([BORDER]) * (stride * stride)
+            for x in range(size):
+                start = (x + PAD) * stride + PAD
+                cells[start:start + size] = bytes(size)
+        self.cells = cells
+        # (0, 1), (1, 0), (1, 1) and (1, -1) in (x, y)
+        self.steps = (1, stride, stride + 1, stride - 1)
+        self.around = tuple(dx * stride + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+        self.playable = tuple((x + PAD) * stride + PAD + y for x in range(size) for y in range(size))
+
+    @classmethod
+    def from_rows(cls, rows):
+        board = cls(len(rows))
+        for x, row in enumerate(rows):
+            for y, marker in enumerate(row):
+                if marker != '.':
+                    board.set(x, y, marker)
+        return board
+
+    def copy(self):
+        return Board(self.size, bytearray(self.cells))
+
+    def view(self):
+        return memoryview(self.cells)
+
+    def index(self, x, y):
+        return (x + PAD) * self.stride + y + PAD
+
+    def coords(self, idx):
+        x, y = divmod(idx, self.stride)
+        return x - PAD, y - PAD
+
+    def get(self, x, y):
+        return MARKERS[self.cells[(x + PAD) * self.stride + y + PAD]]
+
+    def set(self, x, y, marker):
+        self.cells[(x + PAD) * self.stride + y + PAD] = CODES[marker]
+
+    def is_full(self):
+        return EMPTY not in self.cells
+
+    def empties(self):
+        cells = self.cells
+        return [idx for idx in self.playable if cells[idx] == EMPTY]
+
+    def line(self, idx, code, step):
+        """Run of code through idx along step, counting idx itself: (count, open ends, first, last)."""
+        cells = self.cells
+        fwd = idx + step
+        while cells[fwd] == code:
+            fwd += step
+        back = idx - step
+        while cells[back] == code:
+            back -= step
+        return (fwd - back) // step - 1, (cells[fwd] == EMPTY) + (cells[back] == EMPTY), back + step, fwd - step
+
+    def five_at(self, idx, code, exact=True):
+        """(first, last) of a five through idx for code, or None; exact rejects overlines."""
+        for step in self.steps:
+            count, _, first, last = self.line(idx, code, step)
+            if count == 5 or (count > 5 and not exact):
+                return first, last
+        return None
+
+    def five(self, code, exact=True):
+        """(first, last) of any five for code on the board, or None."""
+        cells = self.cells
+        for idx in self.playable:
+            if cells[idx] == code:
+                for step in self.steps:
+                    # Only count runs from their first stone
+                    if cells[idx - step] == code:
+                        continue
+                    end = idx + step
+                    while cells[end] == code:
+                        end += step
+                    count = (end - idx) // step
+                    if count == 5 or (count > 5 and not exact):
+                        return idx, end - step
+        return None
+
+    def empty_neighbours(self):
+        """Empty cells next to any stone."""
+        cells = self.cells
+        around = self.around
+        moves = set()
+        for idx in self.playable:
+            if cells[idx]:
+                for offset in around:
+                    if cells[idx + offset] == EMPTY:
+                        moves.add(idx + offset)
+        return moves
+
+    def count_around(self, idx):
+        cells = self.cells
+        return sum(1 for offset in self.around if 0 < cells[idx + offset] < BORDER)
+
+
+class WindowTable:
+    """Every run of five cells on a board of size, in Board indices.
+
+    windows[w] holds the five cells of window w, first to last along its
+    direction; cell_windows[idx] lists (w, 3 ** position) for each window
+    through cell idx, so a window's contents can be kept as a base-3 key
+    and updated with one add per window when a cell changes.
+    """
+
+    def __init__(self, size):
+        start = time.perf_counter()
+        board = Board(size)
+        self.size = size
+        self.windows = []
+        self.cell_windows = [() for _ in board.cells]
+        windows_of = {}
+        for idx in board.playable:
+            for step in board.steps:
+                cells = tuple(idx + k * step for k in range(5))
+                if board.cells[cells[-1]] == BORDER:
+                    continue
+                for position, cell in enumerate(cells):
+                    windows_of.setdefault(cell, []).append((len(self.windows), 3 ** position))
+                self.windows.append(cells)
+        for cell, entries in windows_of.items():
+            self.cell_windows[cell] = tuple(entries)
+        self.build_seconds = time.perf_counter() - start
+
+    def memory_bytes(self):
+        """Approximate size of the tables, containers included."""
+        total = sys.getsizeof(self.windows) + sys.getsizeof(self.cell_windows)
+        total += sum(sys.getsizeof(w) for w in self.windows)
+        for entries in self.cell_windows:
+            if entries:
+                total += sys.getsizeof(entries) + sum(sys.getsizeof(e) for e in entries)
+        return total
+
+
+_window_tables = {}
+
+
+def window_table(size):
+    """The WindowTable for size, built on first use."""
+    table = _window_tables.get(size)
+    if table is None:
+        table = _window_tables[size] = WindowTable(size)
+    return table
@@ -52,6 +52,9 @@ pygame.display.set_caption("Gomoku")
 screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 clock = pygame.time.Clock()
 FPS = 60
+# Longest stretch the AI searches before handing control back to the event
+# loop; in the browser nothing else runs (not even drawing) until it does
+SEARCH_SLICE = 0.008
 
 # Fonts
 try:
@@ -136,6 +139,10 @@ class Gomoku:
         self.show_modal = False
         self.show_difficulty_modal = False
         self.difficulty = "Medium"
+        self.slice_deadline = None
+        self.slices = 0
+        self.longest_slice = 0.0
+        self.longest_slice_cpu = 0.0
         self.play_again_button = Button(
             WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 50, 200, 60,
             "Play Again", BUTTON_COLOR, BUTTON_HOVER_COLOR
@@ -399,7 +406,12 @@ class Gomoku:
         return True, (start_x, start_y, end_x, end_y)
 
     def is_winner(self, player):
+        return run_search(self.find_winner(player))
+
+    def find_winner(self, player):
+        """Generator form of is_winner, checking the slice budget every row."""
         for x in range(BOARD_SIZE):
+            yield from self.checkpoint()
             for y in range(BOARD_SIZE):
                 for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)]:
                     won, line = self.check_line(x, y, dx, dy, player)
@@ -412,8 +424,13 @@ class Gomoku:
         return all(cell != EMPTY for row in self.board for cell in row)
 
     def evaluate_easy(self):
+        return run_search(self.easy_evaluation())
+
+    def easy_evaluation(self):
+        """Generator form of evaluate_easy, checking the slice budget before each direction."""
         def count_lines(player):
             lines = 0
+            yield from self.checkpoint()
             for i in range(BOARD_SIZE):
                 for j in range(BOARD_SIZE - 4):
                     segment = [self.board[i][j+k] for k in range(5)]
@@ -423,6 +440,7 @@ class Gomoku:
                         lines += 10
                     elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
                         lines += 5
+            yield from self.checkpoint()
             for i in range(BOARD_SIZE - 4):
                 for j in range(BOARD_SIZE):
                     segment = [self.board[i+k][j] for k in range(5)]
@@ -432,6 +450,7 @@ class Gomoku:
                         lines += 10
                     elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
                         lines += 5
+            yield from self.checkpoint()
             for i in range(BOARD_SIZE - 4):
                 for j in range(BOARD_SIZE - 4):
                     segment = [self.board[i+k][j+k] for k in range(5)]
@@ -441,6 +460,7 @@ class Gomoku:
                         lines += 10
                     elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
                         lines += 5
+            yield from self.checkpoint()
             for i in range(4, BOARD_SIZE):
                 for j in range(BOARD_SIZE - 4):
                     segment = [self.board[i-k][j+k] for k in range(5)]
@@ -451,9 +471,15 @@ class Gomoku:
                     elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
                         lines += 5
             return lines
-        return count_lines(AI) - count_lines(PLAYER) + random.randint(-5, 5)
+        ai_lines = yield from count_lines(AI)
+        player_lines = yield from count_lines(PLAYER)
+        return ai_lines - player_lines + random.randint(-5, 5)
 
     def evaluate_medium(self):
+        return run_search(self.medium_evaluation())
+
+    def medium_evaluation(self):
+        """Generator form of evaluate_medium, checking the slice budget before each direction."""
         def score_pattern(pattern, player):
             opponent = PLAYER if player == AI else AI
             if pattern.count(player) == 5:
@@ -470,18 +496,22 @@ class Gomoku:
                 return -10
             return 0
         score = 0
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i][j+k] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE - 4):
             for j in range(BOARD_SIZE):
                 pattern = [self.board[i+k][j] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE - 4):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i+k][j+k] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(4, BOARD_SIZE):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i-k][j+k] for k in range(5)]
@@ -490,6 +520,10 @@ class Gomoku:
         return score
 
     def evaluate_hard(self):
+        return run_search(self.hard_evaluation())
+
+    def hard_evaluation(self):
+        """Generator form of evaluate_hard, checking the slice budget before each direction."""
         def score_pattern(pattern, player):
             opponent = PLAYER if player == AI else AI
             if pattern.count(player) == 5:
@@ -512,23 +546,28 @@ class Gomoku:
                 return -10 if 0 in empty_indices and 4 in empty_indices else -5
             return 0
         score = 0
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i][j+k] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE - 4):
             for j in range(BOARD_SIZE):
                 pattern = [self.board[i+k][j] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE - 4):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i+k][j+k] for k in range(5)]
                 score += score_pattern(pattern, AI)
+        yield from self.checkpoint()
         for i in range(4, BOARD_SIZE):
             for j in range(BOARD_SIZE - 4):
                 pattern = [self.board[i-k][j+k] for k in range(5)]
                 score += score_pattern(pattern, AI)
         center = BOARD_SIZE // 2
+        yield from self.checkpoint()
         for i in range(BOARD_SIZE):
             for j in range(BOARD_SIZE):
                 if self.board[i][j] == AI:
@@ -543,20 +582,39 @@ class Gomoku:
             return self.evaluate_medium()
         return self.evaluate_hard()
 
+    def evaluation(self):
+        """Generator form of evaluate."""
+        if self.difficulty == "Easy":
+            return (yield from self.easy_evaluation())
+        elif self.difficulty == "Medium":
+            return (yield from self.medium_evaluation())
+        return (yield from self.hard_evaluation())
+
+    def checkpoint(self):
+        """Generator: yields once if slice_deadline has passed."""
+        if self.slice_deadline is not None and time.perf_counter() >= self.slice_deadline:
+            yield
+
     def minimax(self, depth, alpha, beta, is_maximizing):
-        if self.is_winner(AI):
+        """Generator: yields whenever slice_deadline has passed, and returns the score.
+
+        Win checks, evaluation and move generation check the deadline as
+        they go, so a slice overruns by at most a fraction of one of them.
+        """
+        yield from self.checkpoint()
+        if (yield from self.find_winner(AI)):
             return 1000 * (depth + 1)
-        if self.is_winner(PLAYER):
+        if (yield from self.find_winner(PLAYER)):
             return -1000 * (depth + 1)
         if self.is_full() or depth == 0:
-            return self.evaluate()
-        legal_moves = self.get_smart_moves()
+            return (yield from self.evaluation())
+        legal_moves = yield from self.smart_moves()
         if is_maximizing:
             max_eval = float('-inf')
             for move in legal_moves:
                 x, y = move
                 self.make_move(x, y, AI, animate=False)
-                eval = self.minimax(depth - 1, alpha, beta, False)
+                eval = yield from self.minimax(depth - 1, alpha, beta, False)
                 self.undo_move(x, y)
                 max_eval = max(max_eval, eval)
                 alpha = max(alpha, eval)
@@ -568,7 +626,7 @@ class Gomoku:
             for move in legal_moves:
                 x, y = move
                 self.make_move(x, y, PLAYER, animate=False)
-                eval = self.minimax(depth - 1, alpha, beta, True)
+                eval = yield from self.minimax(depth - 1, alpha, beta, True)
                 self.undo_move(x, y)
                 min_eval = min(min_eval, eval)
                 beta = min(beta, eval)
@@ -577,11 +635,16 @@ class Gomoku:
             return min_eval
 
     def get_smart_moves(self):
+        return run_search(self.smart_moves())
+
+    def smart_moves(self):
+        """Generator form of get_smart_moves, checking the slice budget every row."""
         if not any(cell != EMPTY for row in self.board for cell in row):
             center = BOARD_SIZE // 2
             return [(center, center)]
         moves = set()
         for i in range(BOARD_SIZE):
+            yield from self.checkpoint()
             for j in range(BOARD_SIZE):
                 if self.board[i][j] != EMPTY:
                     for di in range(-1, 2):
@@ -594,15 +657,19 @@ class Gomoku:
         return list(moves) or self.get_legal_moves()
 
     def get_best_move(self):
+        return run_search(self.search_best_move())
+
+    def search_best_move(self):
+        """Generator form of get_best_move, for searching a slice at a time."""
         best_score = float('-inf')
         best_move = None
         depth = DIFFICULTY_LEVELS[self.difficulty]["depth"]
-        legal_moves = self.get_smart_moves()
+        legal_moves = yield from self.smart_moves()
         random.shuffle(legal_moves)
         for move in legal_moves:
             x, y = move
             self.make_move(x, y, AI, animate=False)
-            score = self.minimax(depth, float('-inf'), float('inf'), False)
+            score = yield from self.minimax(depth, float('-inf'), float('inf'), False)
             self.undo_move(x, y)
             if self.difficulty == "Easy":
                 score += random.randint(-100, 100)
@@ -616,7 +683,50 @@ class Gomoku:
     def ai_move(self):
         if self.game_state != "playing":
             return
-        move = self.get_best_move()
+        self.play_ai_move(self.get_best_move())
+
+    async def ai_move_async(self, slice_seconds=SEARCH_SLICE):
+        """ai_move that gives the event loop a turn every slice_seconds of search.
+
+        The search runs on a copy of the board, so frames drawn meanwhile
+        don't show its trial stones. slices and longest_slice record how it
+        went; longest_slice_cpu is the longest slice in this thread's CPU
+        time, which other processes taking the CPU don't inflate.
+        """
+        if self.game_state != "playing":
+            return
+        searcher = self.search_copy()
+        search = searcher.search_best_move()
+        self.slices = 0
+        self.longest_slice = self.longest_slice_cpu = 0.0
+        while True:
+            start = time.perf_counter()
+            start_cpu = time.thread_time()
+            searcher.slice_deadline = start + slice_seconds
+            try:
+                next(search)
+            except StopIteration as done:
+                move = done.value
+                break
+            finally:
+                self.slices += 1
+                self.longest_slice = max(self.longest_slice, time.perf_counter() - start)
+                self.longest_slice_cpu = max(self.longest_slice_cpu, time.thread_time() - start_cpu)
+            await asyncio.sleep(0)
+        self.play_ai_move(move)
+
+    def search_copy(self):
+        """A bare Gomoku holding just what the search touches: board, stones and difficulty."""
+        copy = Gomoku.__new__(Gomoku)
+        copy.board = [row[:] for row in self.board]
+        copy.stones = list(self.stones)
+        copy.last_move = self.last_move
+        copy.winner_line = None
+        copy.difficulty = self.difficulty
+        copy.slice_deadline = None
+        return copy
+
+    def play_ai_move(self, move):
         if move:
             x, y = move
             self.make_move(x, y, AI)
@@ -659,11 +769,20 @@ class Gomoku:
         y = (pos[0] - MARGIN_LEFT + CELL_SIZE // 2) // CELL_SIZE
         self.hover_pos = (x, y) if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE else None
 
+def run_search(search):
+    """Run a search generator to the end in one go and return its result."""
+    while True:
+        try:
+            next(search)
+        except StopIteration as done:
+            return done.value
+
 class GameManager:
     def __init__(self):
         self.state = "menu"
         self.game = None
         self.ai_thinking = False
+        self.ai_task = None
         self.selected_difficulty = "Medium"
 
         # Layout constants
@@ -813,9 +932,13 @@ class GameManager:
                 pygame.time.set_timer(pygame.USEREVENT, 0)
                 self.ai_thinking = True
 
-        if self.state == "playing" and self.game.game_state == "playing" and len(self.game.stones) % 2 == 1 and self.ai_thinking:
-            self.game.ai_move()
+        # The AI searches in slices between frames, so the page keeps drawing and taking input
+        if self.ai_task is not None and self.ai_task.done():
+            self.ai_task.result()
+            self.ai_task = None
             self.ai_thinking = False
+        elif self.state == "playing" and self.game.game_state == "playing" and len(self.game.stones) % 2 == 1 and self.ai_thinking and self.ai_task is None:
+            self.ai_task = asyncio.ensure_future(self.game.ai_move_async())
 
         return True
 
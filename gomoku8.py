@@ -6,6 +6,16 @@ import time
 from pygame import gfxdraw
 import platform
 import asyncio
+import os
+from audio import AudioDispatcher
+import board
+import mcts
+import records
+import rules
+from profiler import FrameProfiler
+from render_cache import RenderCache
+import search_cache
+import solver
 
 # Game constants
 BOARD_SIZE = 10
@@ -16,6 +26,11 @@ WINDOW_HEIGHT = 1000
 MARGIN_LEFT = (WINDOW_WIDTH - BOARD_PIXEL_SIZE) // 2
 MARGIN_TOP = (WINDOW_HEIGHT - BOARD_PIXEL_SIZE) // 2
 
+# Screen regions redrawn by the dirty-rectangle renderer
+TOP_BAR_RECT = (0, 10, WINDOW_WIDTH, 40)
+TITLE_RECT = (0, 40, WINDOW_WIDTH, 85)
+STATUS_RECT = (0, WINDOW_HEIGHT - 85, WINDOW_WIDTH, 85)
+
 # Colors
 MAIN_BACKGROUND = (20, 25, 35)
 BOARD_BACKGROUND = (245, 245, 220)
@@ -40,44 +55,136 @@ PLAYER = 'X'
 AI = 'O'
 
 # Difficulty settings
+# Difficulty profiles: minimax deepens iteratively up to "depth" plies after the
+# root move, stopping at the "nodes" or "time" (seconds) budget, whichever comes
+# first. "width" caps the candidates searched per node (0: all of them). Past
+# the depth, up to "quiescence_nodes" forcing moves (fours, and open threes
+# with "quiescence_threes") are searched so threats are not cut off mid-fight.
+# "lmr" and "null_move" switch on late-move reductions and null-move pruning;
+# null moves are only tried under freestyle rules, where they are sound.
 DIFFICULTY_LEVELS = {
-    "Easy": {"depth": 1, "color": EASY_COLOR},
-    "Medium": {"depth": 2, "color": MEDIUM_COLOR},
-    "Hard": {"depth": 2, "color": HARD_COLOR}
+    "Easy": {"depth": 1, "nodes": 500, "time": 0.5, "width": 8, "evaluator": "easy",
+             "quiescence_nodes": 0, "quiescence_threes": False, "lmr": False, "null_move": False,
+             "eval_jitter": 5, "move_jitter": 100, "mcts_time": 0.3, "color": EASY_COLOR},
+    "Medium": {"depth": 3, "nodes": 3000, "time": 2.0, "width": 12, "evaluator": "medium",
+               "quiescence_nodes": 32, "quiescence_threes": False, "lmr": True, "null_move": False,
+               "eval_jitter": 3, "move_jitter": 30, "mcts_time": 1.0, "color": MEDIUM_COLOR},
+    "Hard": {"depth": 6, "nodes": 5000, "time": 6.0, "width": 10, "evaluator": "hard",
+             "quiescence_nodes": 64, "quiescence_threes": True, "lmr": True, "null_move": True,
+             "eval_jitter": 0, "move_jitter": 0, "mcts_time": 2.0, "color": HARD_COLOR}
 }
-
-# Initialize Pygame
-pygame.init()
+# Override or add profiles from a JSON file, e.g. {"Hard": {"nodes": 50000}}
+DIFFICULTY_FILE = os.environ.get("GOMOKU_DIFFICULTY")
+
+def load_difficulty_profiles(path):
+    """Merge profiles from a JSON file into DIFFICULTY_LEVELS; new levels start from Medium."""
+    import json
+    with open(path) as f:
+        profiles = json.load(f)
+    for level, settings in profiles.items():
+        profile = dict(DIFFICULTY_LEVELS.get(level, DIFFICULTY_LEVELS["Medium"]))
+        profile.update(settings)
+        profile["color"] = tuple(profile["color"])
+        # Pattern weights, e.g. from tune.py, define a new evaluator of their own
+        if "weights" in settings and profile["evaluator"] in ("easy", "medium", "hard"):
+            raise ValueError(f"{path}: {level} has weights, so its evaluator needs a new name")
+        if "weights" not in profile and profile["evaluator"] not in ("easy", "medium", "hard"):
+            raise ValueError(f"{path}: unknown evaluator {profile['evaluator']!r} for {level}")
+        DIFFICULTY_LEVELS[level] = profile
+
+if DIFFICULTY_FILE:
+    load_difficulty_profiles(DIFFICULTY_FILE)
+
+# Search engines: full-width alpha-beta or Monte Carlo tree search
+ENGINES = ["minimax", "mcts"]
+# Rule variants (rules.RULES); GOMOKU_RULES picks the one the menu starts on
+DEFAULT_RULES = os.environ.get("GOMOKU_RULES", rules.STANDARD)
+if DEFAULT_RULES not in rules.RULES:
+    raise ValueError(f"GOMOKU_RULES must be one of {', '.join(rules.RULES)}, not {DEFAULT_RULES!r}")
+MCTS_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# Search cache, kept across turns and games; set GOMOKU_CACHE to persist it on disk
+CACHE_FILE = os.environ.get("GOMOKU_CACHE")
+CACHE_BYTES = 16 * 1024 * 1024
+# Append finished games to this record file when GOMOKU_RECORDS is set
+RECORD_FILE = os.environ.get("GOMOKU_RECORDS")
+ZOBRIST = search_cache.zobrist_table(BOARD_SIZE, (PLAYER, AI))
+DIFFICULTY_SALTS = {level: search_cache.salt(level) for level in DIFFICULTY_LEVELS}
+# The same stones score differently under each rule variant
+RULES_SALTS = {name: search_cache.salt(f"rules {name}") for name in rules.RULES}
+# Selective search: reduce quiet moves after the first LMR_AFTER, and let a pass
+# searched NULL_MOVE_R plies shallower prove a cutoff
+LMR_AFTER = 3
+NULL_MOVE_R = 2
+NULL_MOVE_KEY = search_cache.salt("null move")
+# Threat levels of a single move, used to prune the search under forcing threats
+OPEN_THREE = 1
+FOUR = 2
+OPEN_FOUR = 3
+FIVE = 4
+
+# Initialize Pygame: only the window and fonts up front, so it shows before anything
+# else loads; the mixer starts with the sounds, after the first frame
+pygame.display.init()
+pygame.font.init()
 pygame.display.set_caption("Gomoku")
 screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+screen.fill(MAIN_BACKGROUND)
+pygame.display.flip()
 clock = pygame.time.Clock()
 FPS = 60
-
-# Fonts
-try:
-    title_font = pygame.font.Font(None, 70)
-    game_font = pygame.font.Font(None, 36)
-    status_font = pygame.font.Font(None, 30)
-    timer_font = pygame.font.Font(None, 40)
-    modal_font = pygame.font.Font(None, 60)
-    button_font = pygame.font.Font(None, 36)
-except:
-    title_font = pygame.font.SysFont(None, 70)
-    game_font = pygame.font.SysFont(None, 36)
-    status_font = pygame.font.SysFont(None, 30)
-    timer_font = pygame.font.SysFont(None, 40)
-    modal_font = pygame.font.SysFont(None, 60)
-    button_font = pygame.font.SysFont(None, 36)
-
-# Sound effects
-try:
-    pygame.mixer.init()
-    stone_sound = pygame.mixer.Sound("stone_sound.wav")
-    win_sound = pygame.mixer.Sound("win_sound.wav")
-    has_sound = True
-except:
-    print("Warning: Sound initialization failed")
-    has_sound = False
+# Adaptive frame scheduling: full rate while stones animate, a lower rate for
+# ambient pulses, and only the clock tick once nobody has touched the game
+AMBIENT_FPS = 20
+IDLE_AFTER = 10.0
+
+# Pre-rendered text, backgrounds and animation frames
+render_cache = RenderCache()
+TITLE_PULSE_FRAMES = 24
+
+# Fonts, created on first use
+FONT_SIZES = {"title": 70, "game": 36, "status": 30, "timer": 40, "modal": 60, "button": 36}
+
+def font(name):
+    return render_cache.font(FONT_SIZES[name])
+
+# Frame profiler: F3 toggles the HUD, F4 records a CSV trace
+profiler = FrameProfiler()
+PROFILE_TRACE_FILE = "frame_trace.csv"
+
+# Sound effects, played on game events; GOMOKU_SOUND=0 leaves the mixer untouched
+SOUND_ENABLED = os.environ.get("GOMOKU_SOUND", "1") != "0"
+SOUND_FILES = {"stone": "stone_sound.wav", "win": "win_sound.wav"}
+SOUND_EVENTS = {"stone_placed": "stone", "player_win": "win", "ai_win": "win"}
+SOUND_CHANNELS = 4
+# The browser has no threads, so the sounds load on the main thread there
+audio = AudioDispatcher(SOUND_FILES, SOUND_EVENTS, SOUND_CHANNELS, intervals={"win": 1.0},
+                        enabled=SOUND_ENABLED, threaded=platform.system() != "Emscripten")
+
+def build_modal_overlay():
+    overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 150))
+    return overlay
+
+def build_menu_background():
+    background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    top_color = (30, 50, 80)
+    bottom_color = (15, 25, 45)
+    check_size = 40
+    for y in range(WINDOW_HEIGHT):
+        ratio = y / WINDOW_HEIGHT
+        r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
+        g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
+        b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
+        pygame.draw.line(background, (r, g, b), (0, y), (WINDOW_WIDTH, y))
+
+    check_color = (255, 255, 255, 10)
+    check_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+    for x in range(0, WINDOW_WIDTH, check_size):
+        for y in range(0, WINDOW_HEIGHT, check_size):
+            pygame.draw.rect(check_surface, check_color, (x, y, check_size, check_size), 1)
+    background.blit(check_surface, (0, 0))
+    return background
 
 class Button:
     def __init__(self, x, y, width, height, text, color, hover_color):
@@ -91,7 +198,7 @@ class Button:
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(surface, color, self.rect, border_radius=10)
         pygame.draw.rect(surface, (255, 255, 255), self.rect, border_radius=10, width=2)
-        text_surf = button_font.render(self.text, True, (255, 255, 255))
+        text_surf = render_cache.text(font("button"), self.text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
 
@@ -117,22 +224,136 @@ class Stone:
         if self.animate and self.radius < self.max_radius:
             self.radius += 2
             self.alpha = min(255, self.alpha + 15)
+            return True
+        return False
 
     def draw(self, surface):
-        color = PLAYER_COLOR if self.player == PLAYER else AI_COLOR
-        shadow_radius = self.radius + 2
-        shadow_pos = (self.x + 2, self.y + 2)
-        gfxdraw.filled_circle(surface, shadow_pos[0], shadow_pos[1], shadow_radius, (20, 20, 20, 100))
-        gfxdraw.aacircle(surface, self.x, self.y, self.radius, color)
-        gfxdraw.filled_circle(surface, self.x, self.y, self.radius, color)
-        if self.radius > 3:
-            highlight_radius = max(2, self.radius - 5)
-            highlight_pos = (self.x - 2, self.y - 2)
-            gfxdraw.filled_circle(surface, highlight_pos[0], highlight_pos[1], highlight_radius, (255, 255, 255, 80))
+        surface.blit(*stone_atlas().blit_args(self))
+
+class StoneAtlas:
+    """Every stone sprite, per player and animation radius, pre-rendered on one surface."""
+
+    def __init__(self, cell_size):
+        max_radius = cell_size // 3
+        # Radii grow in steps of 2 and may overshoot an odd max_radius by one
+        radii = range(0, max_radius + 2)
+        self.extent = max_radius + 1 + 4  # shadow is offset by 2 and 2px larger
+        size = self.extent * 2 + 1
+        self.surface = pygame.Surface((size * len(radii), size * 2), pygame.SRCALPHA)
+        self.areas = {}
+        for row, player in enumerate((PLAYER, AI)):
+            for col, radius in enumerate(radii):
+                area = pygame.Rect(col * size, row * size, size, size)
+                self.render(area, player, radius)
+                self.areas[(player, radius)] = area
+        if pygame.display.get_surface():
+            self.surface = self.surface.convert_alpha()
+
+    def render(self, area, player, radius):
+        # gfxdraw blends alpha colours into the target's alpha too, so translucent layers
+        # are drawn opaque and faded with a surface alpha when blended onto the sprite
+        color = PLAYER_COLOR if player == PLAYER else AI_COLOR
+        c = self.extent
+        layer = pygame.Surface(area.size, pygame.SRCALPHA)
+        gfxdraw.filled_circle(layer, c + 2, c + 2, radius + 2, (20, 20, 20))
+        layer.set_alpha(100)
+        self.surface.blit(layer, area)
+        layer = pygame.Surface(area.size, pygame.SRCALPHA)
+        layer.fill((*color, 0))
+        gfxdraw.aacircle(layer, c, c, radius, color)
+        gfxdraw.filled_circle(layer, c, c, radius, color)
+        self.surface.blit(layer, area)
+        if radius > 3:
+            layer = pygame.Surface(area.size, pygame.SRCALPHA)
+            gfxdraw.filled_circle(layer, c - 2, c - 2, max(2, radius - 5), (255, 255, 255))
+            layer.set_alpha(80)
+            self.surface.blit(layer, area)
+
+    def blit_args(self, stone):
+        return (self.surface, (stone.x - self.extent, stone.y - self.extent), self.areas[(stone.player, stone.radius)])
+
+def stone_atlas():
+    return render_cache.surface(("stone_atlas", CELL_SIZE), lambda: StoneAtlas(CELL_SIZE))
+
+def easy_window_score(pattern):
+    def count_lines(player):
+        if pattern.count(player) == 5:
+            return 100
+        elif pattern.count(player) == 4 and pattern.count(EMPTY) == 1:
+            return 10
+        elif pattern.count(player) == 3 and pattern.count(EMPTY) == 2:
+            return 5
+        return 0
+    return count_lines(AI) - count_lines(PLAYER)
+
+def medium_window_score(pattern):
+    if pattern.count(AI) == 5:
+        return 1000
+    elif pattern.count(AI) == 4 and pattern.count(EMPTY) == 1:
+        return 100
+    elif pattern.count(AI) == 3 and pattern.count(EMPTY) == 2:
+        return 10
+    elif pattern.count(AI) == 2 and pattern.count(EMPTY) == 3:
+        return 1
+    elif pattern.count(PLAYER) == 4 and pattern.count(EMPTY) == 1:
+        return -100
+    elif pattern.count(PLAYER) == 3 and pattern.count(EMPTY) == 2:
+        return -10
+    return 0
+
+def hard_window_score(pattern):
+    if pattern.count(AI) == 5:
+        return 10000
+    elif pattern.count(AI) == 4 and pattern.count(EMPTY) == 1:
+        return 1000 if EMPTY in [pattern[0], pattern[4]] else 500
+    elif pattern.count(AI) == 3 and pattern.count(EMPTY) == 2:
+        empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
+        return 200 if 0 in empty_indices and 4 in empty_indices else 50
+    elif pattern.count(AI) == 2 and pattern.count(EMPTY) == 3:
+        empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
+        return 10 if 0 in empty_indices and 4 in empty_indices else 5
+    elif pattern.count(PLAYER) == 4 and pattern.count(EMPTY) == 1:
+        return -1000
+    elif pattern.count(PLAYER) == 3 and pattern.count(EMPTY) == 2:
+        empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
+        return -200 if 0 in empty_indices and 4 in empty_indices else -50
+    elif pattern.count(PLAYER) == 2 and pattern.count(EMPTY) == 3:
+        empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
+        return -10 if 0 in empty_indices and 4 in empty_indices else -5
+    return 0
+
+def pattern_table(score):
+    """score for every window of five, indexed by its base-3 key (board.WindowTable)."""
+    return [score([board.MARKERS[key // 3 ** k % 3] for k in range(5)]) for key in range(3 ** 5)]
+
+WINDOWS = board.window_table(BOARD_SIZE)
+PATTERN_SCORES = {"easy": pattern_table(easy_window_score),
+                  "medium": pattern_table(medium_window_score),
+                  "hard": pattern_table(hard_window_score)}
+# Tables of tuned profiles; set_cell only loops over these when there are any
+TUNED_PATTERN_SCORES = {}
+for profile in DIFFICULTY_LEVELS.values():
+    if "weights" in profile:
+        import tune
+        TUNED_PATTERN_SCORES[profile["evaluator"]] = tune.pattern_scores(profile["weights"])
+PATTERN_SCORES.update(TUNED_PATTERN_SCORES)
+# Whose five in a row each window key is, if anyone's
+FULL_WINDOW_SIDE = pattern_table(lambda pattern: pattern[0] if pattern[0] != EMPTY and pattern.count(pattern[0]) == 5 else None)
+
+class _OutOfBudget(Exception):
+    pass
 
 class Gomoku:
-    def __init__(self):
-        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+    def __init__(self, cache=None):
+        self.rules = DEFAULT_RULES
+        self.clear_position()
+        self.cache = cache if cache is not None else search_cache.SearchCache(CACHE_BYTES, BOARD_SIZE)
+        self.forcing_moves = True
+        self.nodes = 0
+        self.node_limit = None
+        self.deadline = None
+        self.search_depth = None
+        self.search_stats = None
         self.stones = []
         self.last_move = None
         self.winner_line = None
@@ -143,6 +364,10 @@ class Gomoku:
         self.show_modal = False
         self.show_difficulty_modal = False
         self.difficulty = "Medium"
+        self.solve_message = None
+        self.engine = "minimax"
+        self.mcts_engine = None
+        self.recorder = None
         self.play_again_button = Button(
             WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 2 + 50, 200, 60,
             "Play Again", BUTTON_COLOR, BUTTON_HOVER_COLOR
@@ -157,16 +382,20 @@ class Gomoku:
         # Cache board background
         self.board_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
         self.draw_background_static()
+        # What the last frame showed, for the dirty-rectangle renderer
+        self.drawn = None
 
     def reset(self):
-        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.clear_position()
         self.stones = []
         self.last_move = None
         self.winner_line = None
         self.game_state = "playing"
         self.show_modal = False
         self.show_difficulty_modal = True
+        self.solve_message = None
         self.start_time = time.time()
+        self.drawn = None
 
     def draw_background_static(self):
         self.board_surface.fill(MAIN_BACKGROUND)
@@ -199,6 +428,7 @@ class Gomoku:
                 pygame.draw.circle(self.board_surface, GRID_COLOR, center, 5)
                 pygame.draw.circle(self.board_surface, (0, 0, 0), center, 3)
 
+    @profiler.timed()
     def draw_background(self):
         screen.blit(self.board_surface, (0, 0))
         if self.hover_pos and self.is_valid_move(self.hover_pos[0], self.hover_pos[1]):
@@ -214,11 +444,16 @@ class Gomoku:
                             (center[0] - CELL_SIZE // 2, center[1] - CELL_SIZE // 2, CELL_SIZE, CELL_SIZE),
                             border_radius=5)
 
-    def draw_stones(self):
-        for stone in self.stones:
-            stone.update()
-            stone.draw(screen)
+    def update_stones(self):
+        return [stone for stone in self.stones if stone.update()]
+
+    @profiler.timed()
+    def draw_stones(self, area=None):
+        atlas = stone_atlas()
+        screen.blits([atlas.blit_args(stone) for stone in self.stones
+                      if area is None or area.collidepoint(stone.x, stone.y)], doreturn=False)
 
+    @profiler.timed()
     def draw_winner_line(self):
         if self.winner_line and self.game_state in ["player_win", "ai_win"]:
             start_x, start_y, end_x, end_y = self.winner_line
@@ -232,38 +467,50 @@ class Gomoku:
                     pygame.draw.line(screen, glow_color, start_pos, end_pos, width)
             pygame.draw.line(screen, color, start_pos, end_pos, 4)
 
-    def draw_status(self):
+    def timer_text(self):
         self.elapsed_time = time.time() - self.start_time if self.game_state == "playing" else self.elapsed_time
         minutes = int(self.elapsed_time // 60)
         seconds = int(self.elapsed_time % 60)
-        timer_text = f"{minutes:02d}:{seconds:02d}"
-        timer_surface = timer_font.render(timer_text, True, TIMER_COLOR)
+        return f"{minutes:02d}:{seconds:02d}"
+
+    @profiler.timed()
+    def draw_status(self):
+        timer_text = self.timer_text()
+        timer_surface = render_cache.text(font("timer"), timer_text, TIMER_COLOR)
         screen.blit(timer_surface, (WINDOW_WIDTH // 2 - timer_surface.get_width() // 2, 20))
-        difficulty_surface = status_font.render(f"Difficulty: {self.difficulty}", True, DIFFICULTY_LEVELS[self.difficulty]["color"])
+        engine_label = " (MCTS)" if self.engine == "mcts" else ""
+        if self.rules != rules.STANDARD:
+            engine_label += f", {self.rules.capitalize()}"
+        difficulty_surface = render_cache.text(font("status"), f"Difficulty: {self.difficulty}{engine_label}", DIFFICULTY_LEVELS[self.difficulty]["color"])
         screen.blit(difficulty_surface, (WINDOW_WIDTH - difficulty_surface.get_width() - 20, 20))
         if not self.show_modal and not self.show_difficulty_modal:
             if self.game_state == "playing":
-                status = status_font.render("Your turn" if len(self.stones) % 2 == 0 else "AI is thinking...", True, TEXT_COLOR)
+                status = render_cache.text(font("status"), "Your turn" if len(self.stones) % 2 == 0 else "AI is thinking...", TEXT_COLOR)
             elif self.game_state == "player_win":
-                status = status_font.render("You win!", True, PLAYER_COLOR)
+                status = render_cache.text(font("status"), "You win!", PLAYER_COLOR)
             elif self.game_state == "ai_win":
-                status = status_font.render("AI wins!", True, AI_COLOR)
+                status = render_cache.text(font("status"), "AI wins!", AI_COLOR)
             else:
-                status = status_font.render("Draw!", True, TEXT_COLOR)
+                status = render_cache.text(font("status"), "Draw!", TEXT_COLOR)
             screen.blit(status, (WINDOW_WIDTH // 2 - status.get_width() // 2, WINDOW_HEIGHT - 40))
+            if self.solve_message:
+                solve_surface = render_cache.text(font("status"), self.solve_message, TIMER_COLOR)
+                screen.blit(solve_surface, (WINDOW_WIDTH // 2 - solve_surface.get_width() // 2, WINDOW_HEIGHT - 75))
 
+    @profiler.timed()
     def draw_title(self):
         title_text = "Gomoku"
-        glow_font = pygame.font.Font(None, 75)
         pulse = math.sin(pygame.time.get_ticks() * 0.002) * 0.3 + 0.7
-        glow_scale = int(75 * pulse)
-        glow_surface = glow_font.render(title_text, True, TITLE_GLOW)
-        if glow_scale != 75:
-            glow_font = pygame.font.Font(None, glow_scale)
-            glow_surface = glow_font.render(title_text, True, TITLE_GLOW)
+        # Quantize the pulse so the glow cycles through a fixed set of cached frames
+        step = round((pulse - 0.4) / 0.6 * (TITLE_PULSE_FRAMES - 1))
+        glow_scale = int(75 * (0.4 + 0.6 * step / (TITLE_PULSE_FRAMES - 1)))
+        glow_surface = render_cache.frame(
+            ("title_glow", glow_scale),
+            lambda: render_cache.font(glow_scale).render(title_text, True, TITLE_GLOW)
+        )
         glow_rect = glow_surface.get_rect(center=(WINDOW_WIDTH // 2, 80))
         screen.blit(glow_surface, glow_rect)
-        title_surface = title_font.render(title_text, True, TITLE_COLOR)
+        title_surface = render_cache.text(font("title"), title_text, TITLE_COLOR)
         title_rect = title_surface.get_rect(center=(WINDOW_WIDTH // 2, 80))
         screen.blit(title_surface, title_rect)
         line_length = 100
@@ -278,12 +525,11 @@ class Gomoku:
                         (title_rect.right + line_gap + line_length, line_y), 2)
         pygame.draw.circle(screen, TITLE_COLOR, (title_rect.right + line_gap + line_length, line_y), 4)
 
+    @profiler.timed()
     def draw_difficulty_modal(self):
         if not self.show_difficulty_modal:
             return
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
+        screen.blit(render_cache.surface("modal_overlay", build_modal_overlay), (0, 0))
         modal_width, modal_height = 500, 400
         modal_rect = pygame.Rect(
             (WINDOW_WIDTH - modal_width) // 2,
@@ -299,7 +545,7 @@ class Gomoku:
         pygame.draw.rect(screen, MODAL_BACKGROUND, modal_rect, border_radius=15)
         pygame.draw.rect(screen, TITLE_COLOR, modal_rect, border_radius=15, width=2)
         title_text = "Select Difficulty"
-        title_surf = modal_font.render(title_text, True, TEXT_COLOR)
+        title_surf = render_cache.text(font("modal"), title_text, TEXT_COLOR)
         title_rect = title_surf.get_rect(center=(modal_rect.centerx, modal_rect.y + 50))
         screen.blit(title_surf, title_rect)
         mouse_pos = pygame.mouse.get_pos()
@@ -307,12 +553,11 @@ class Gomoku:
             button.update(mouse_pos)
             button.draw(screen)
 
+    @profiler.timed()
     def draw_win_loss_modal(self):
         if not self.show_modal or self.game_state == "playing":
             return
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
+        screen.blit(render_cache.surface("modal_overlay", build_modal_overlay), (0, 0))
         modal_width, modal_height = 500, 300
         modal_rect = pygame.Rect(
             (WINDOW_WIDTH - modal_width) // 2,
@@ -330,247 +575,343 @@ class Gomoku:
         if self.game_state == "player_win":
             message = "You Won!"
             color = PLAYER_COLOR
-            if has_sound:
-                win_sound.play()
         elif self.game_state == "ai_win":
             message = "You Lost!"
             color = AI_COLOR
-            if has_sound:
-                win_sound.play()
         else:
             message = "It's a Draw!"
             color = TEXT_COLOR
         for i in range(3):
-            glow_surf = modal_font.render(message, True, (*color[:3], 100 - i*30))
+            glow_surf = render_cache.text(font("modal"), message, (*color[:3], 100 - i*30))
             glow_rect = glow_surf.get_rect(center=(modal_rect.centerx, modal_rect.y + 100 + i))
             screen.blit(glow_surf, glow_rect)
-        message_surf = modal_font.render(message, True, color)
+        message_surf = render_cache.text(font("modal"), message, color)
         message_rect = message_surf.get_rect(center=(modal_rect.centerx, modal_rect.y + 100))
         screen.blit(message_surf, message_rect)
         minutes = int(self.elapsed_time // 60)
         seconds = int(self.elapsed_time % 60)
         time_text = f"Time: {minutes:02d}:{seconds:02d}"
-        time_surf = status_font.render(time_text, True, TIMER_COLOR)
+        time_surf = render_cache.text(font("status"), time_text, TIMER_COLOR)
         time_rect = time_surf.get_rect(center=(modal_rect.centerx, modal_rect.y + 150))
         screen.blit(time_surf, time_rect)
         mouse_pos = pygame.mouse.get_pos()
         self.play_again_button.update(mouse_pos)
         self.play_again_button.draw(screen)
 
-    def draw_board(self):
-        self.draw_background()
-        self.draw_stones()
-        self.draw_winner_line()
-        self.draw_status()
-        self.draw_title()
-        if self.show_modal:
-            self.draw_win_loss_modal()
-        if self.show_difficulty_modal:
-            self.draw_difficulty_modal()
+    def draw_board(self, dirty=True, extra=()):
+        """Draw a frame; returns the changed rects, or None if the whole screen was redrawn.
+
+        extra lists additional rects to repaint, such as the area under an overlay.
+        """
+        animating = self.update_stones()
+        frame = {
+            "layout": (self.show_modal, self.show_difficulty_modal, self.game_state,
+                       self.difficulty, self.winner_line),
+            "hover": self.hover_pos if self.hover_pos and self.is_valid_move(*self.hover_pos) else None,
+            "last_move": self.last_move,
+            "timer": self.timer_text(),
+            "status": (len(self.stones) % 2, self.solve_message),
+        }
+        previous, self.drawn = self.drawn, frame
+        # Modals are translucent overlays with hover buttons, so they always get a full frame
+        if (not dirty or previous is None or previous["layout"] != frame["layout"]
+                or self.show_modal or self.show_difficulty_modal):
+            self.draw_background()
+            self.draw_stones()
+            self.draw_winner_line()
+            self.draw_status()
+            self.draw_title()
+            if self.show_modal:
+                self.draw_win_loss_modal()
+            if self.show_difficulty_modal:
+                self.draw_difficulty_modal()
+            return None
+        rects = [pygame.Rect(TITLE_RECT)]  # the title glow pulses every frame
+        rects.extend(pygame.Rect(rect) for rect in extra if rect)
+        cells = {frame["hover"]} if frame["hover"] else set()
+        if previous["hover"] != frame["hover"] and previous["hover"]:
+            cells.add(previous["hover"])
+        if previous["last_move"] != frame["last_move"]:
+            for move in (previous["last_move"], frame["last_move"]):
+                if move:
+                    cells.add(move[:2])
+        cells.update((stone.grid_x, stone.grid_y) for stone in animating)
+        for x, y in cells:
+            rects.append(pygame.Rect(MARGIN_LEFT + y * CELL_SIZE - CELL_SIZE // 2,
+                                     MARGIN_TOP + x * CELL_SIZE - CELL_SIZE // 2, CELL_SIZE, CELL_SIZE))
+        if previous["timer"] != frame["timer"]:
+            rects.append(pygame.Rect(TOP_BAR_RECT))
+        if previous["status"] != frame["status"]:
+            rects.append(pygame.Rect(STATUS_RECT))
+        for rect in rects:
+            screen.set_clip(rect)
+            self.draw_background()
+            self.draw_stones(rect.inflate(CELL_SIZE, CELL_SIZE))
+            if rect.colliderect(TOP_BAR_RECT) or rect.colliderect(STATUS_RECT):
+                self.draw_status()
+            if rect.colliderect(TITLE_RECT):
+                self.draw_title()
+        screen.set_clip(None)
+        return rects
 
     def is_valid_move(self, x, y):
-        return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE and self.board[x][y] == EMPTY
+        return (0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE and self.board[x][y] == EMPTY
+                and not self.is_forbidden(x, y, PLAYER))
 
-    def make_move(self, x, y, player, animate=True):
+    def is_forbidden(self, x, y, player):
+        """True if the rules forbid player the empty cell (x, y); only Renju forbids anything, and only to black."""
+        return self.rules == rules.RENJU and player == PLAYER and self.forbidden.is_forbidden(self.grid.index(x, y))
+
+    def drop_forbidden(self, side, moves):
+        if self.rules != rules.RENJU or side != PLAYER:
+            return moves
+        return [(x, y) for x, y in moves if not self.forbidden.is_forbidden(self.grid.index(x, y))]
+
+    def clear_position(self):
+        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        # The same position as a padded bytearray, for the search's line scans
+        self.grid = board.Board(BOARD_SIZE)
+        self.hash = 0
+        # Base-3 contents of every window of five, and what they add up to
+        # under each evaluator, kept up to date by set_cell
+        self.window_keys = [0] * len(WINDOWS.windows)
+        self.window_scores = {evaluator: 0 for evaluator in PATTERN_SCORES}
+        self.full_windows = {PLAYER: set(), AI: set()}
+        self.center_score = 0
+        # Stones around each cell, for candidate generation
+        self.neighbours = [0] * len(self.grid.cells)
+        self.forbidden = rules.ForbiddenTracker(self.grid)
+
+    def set_cell(self, x, y, player):
+        """Put player, or EMPTY, on (x, y) and update everything derived from the board."""
+        old = self.board[x][y]
+        if old == player:
+            return
         self.board[x][y] = player
+        idx = self.grid.index(x, y)
+        self.grid.cells[idx] = board.CODES[player]
+        self.forbidden.changed(idx)
+        if old != EMPTY:
+            self.hash ^= ZOBRIST[old][x][y]
+        if player != EMPTY:
+            self.hash ^= ZOBRIST[player][x][y]
+        change = board.CODES[player] - board.CODES[old]
+        keys = self.window_keys
+        cell_windows = WINDOWS.cell_windows[idx]
+        easy, medium, hard = PATTERN_SCORES["easy"], PATTERN_SCORES["medium"], PATTERN_SCORES["hard"]
+        easy_total = medium_total = hard_total = 0
+        for window, weight in cell_windows:
+            before = keys[window]
+            after = keys[window] = before + weight * change
+            easy_total += easy[after] - easy[before]
+            medium_total += medium[after] - medium[before]
+            hard_total += hard[after] - hard[before]
+            if FULL_WINDOW_SIDE[after]:
+                self.full_windows[FULL_WINDOW_SIDE[after]].add(window)
+            elif FULL_WINDOW_SIDE[before]:
+                self.full_windows[FULL_WINDOW_SIDE[before]].discard(window)
+        scores = self.window_scores
+        scores["easy"] += easy_total
+        scores["medium"] += medium_total
+        scores["hard"] += hard_total
+        for evaluator, table in TUNED_PATTERN_SCORES.items():
+            total = 0
+            for window, weight in cell_windows:
+                after = keys[window]
+                total += table[after] - table[after - weight * change]
+            scores[evaluator] += total
+        if (old == EMPTY) != (player == EMPTY):
+            neighbours = self.neighbours
+            added = 1 if old == EMPTY else -1
+            for offset in self.grid.around:
+                neighbours[idx + offset] += added
+        if AI in (old, player):
+            center = BOARD_SIZE // 2
+            bonus = (5 - max(abs(x - center), abs(y - center))) // 2
+            self.center_score += bonus if player == AI else -bonus
+
+    def make_move(self, x, y, player, animate=True):
+        if animate:
+            self.solve_message = None
+        self.set_cell(x, y, player)
         self.stones.append(Stone(x, y, player, animate))
         self.last_move = (x, y, player)
-        if has_sound:
-            stone_sound.play()
 
     def undo_move(self, x, y):
-        self.board[x][y] = EMPTY
+        self.set_cell(x, y, EMPTY)
         for i in range(len(self.stones)-1, -1, -1):
             if self.stones[i].grid_x == x and self.stones[i].grid_y == y:
                 self.stones.pop(i)
                 break
 
+    def compute_hash(self):
+        self.hash = 0
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                if self.board[x][y] != EMPTY:
+                    self.hash ^= ZOBRIST[self.board[x][y]][x][y]
+        return self.hash
+
     def get_legal_moves(self):
         return [(i, j) for i in range(BOARD_SIZE) for j in range(BOARD_SIZE) if self.board[i][j] == EMPTY]
 
-    def check_line(self, x, y, dx, dy, player):
-        if self.board[x][y] != player:
-            return False, None
-        start_x, start_y = x, y
-        count = 1
-        for i in range(1, 5):
-            nx, ny = x + i*dx, y + i*dy
-            if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE and self.board[nx][ny] == player:
-                count += 1
-            else:
-                break
-        if count != 5:
-            return False, None
-        nx, ny = start_x - dx, start_y - dy
-        if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE and self.board[nx][ny] == player:
-            return False, None
-        nx, ny = start_x + 5*dx, start_y + 5*dy
-        if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE and self.board[nx][ny] == player:
-            return False, None
-        end_x = start_x + 4*dx
-        end_y = start_y + 4*dy
-        return True, (start_x, start_y, end_x, end_y)
-
     def is_winner(self, player):
-        for x in range(BOARD_SIZE):
-            for y in range(BOARD_SIZE):
-                for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)]:
-                    won, line = self.check_line(x, y, dx, dy, player)
-                    if won:
-                        self.winner_line = line
-                        return True
+        code = board.CODES[player]
+        exact = rules.exact_five(self.rules, code)
+        for window in self.full_windows[player]:
+            line = WINDOWS.windows[window]
+            # An overline holds full windows too, which may or may not win
+            count, _, first, last = self.grid.line(line[0], code, line[1] - line[0])
+            if count == 5 or not exact:
+                self.winner_line = self.grid.coords(first) + self.grid.coords(last)
+                return True
         return False
 
     def is_full(self):
-        return all(cell != EMPTY for row in self.board for cell in row)
+        return self.grid.is_full()
 
     def evaluate_easy(self):
-        def count_lines(player):
-            lines = 0
-            for i in range(BOARD_SIZE):
-                for j in range(BOARD_SIZE - 4):
-                    segment = [self.board[i][j+k] for k in range(5)]
-                    if segment.count(player) == 5:
-                        lines += 100
-                    elif segment.count(player) == 4 and segment.count(EMPTY) == 1:
-                        lines += 10
-                    elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
-                        lines += 5
-            for i in range(BOARD_SIZE - 4):
-                for j in range(BOARD_SIZE):
-                    segment = [self.board[i+k][j] for k in range(5)]
-                    if segment.count(player) == 5:
-                        lines += 100
-                    elif segment.count(player) == 4 and segment.count(EMPTY) == 1:
-                        lines += 10
-                    elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
-                        lines += 5
-            for i in range(BOARD_SIZE - 4):
-                for j in range(BOARD_SIZE - 4):
-                    segment = [self.board[i+k][j+k] for k in range(5)]
-                    if segment.count(player) == 5:
-                        lines += 100
-                    elif segment.count(player) == 4 and segment.count(EMPTY) == 1:
-                        lines += 10
-                    elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
-                        lines += 5
-            for i in range(4, BOARD_SIZE):
-                for j in range(BOARD_SIZE - 4):
-                    segment = [self.board[i-k][j+k] for k in range(5)]
-                    if segment.count(player) == 5:
-                        lines += 100
-                    elif segment.count(player) == 4 and segment.count(EMPTY) == 1:
-                        lines += 10
-                    elif segment.count(player) == 3 and segment.count(EMPTY) == 2:
-                        lines += 5
-            return lines
-        return count_lines(AI) - count_lines(PLAYER) + random.randint(-5, 5)
+        return self.window_scores["easy"]
 
     def evaluate_medium(self):
-        def score_pattern(pattern, player):
-            opponent = PLAYER if player == AI else AI
-            if pattern.count(player) == 5:
-                return 1000
-            elif pattern.count(player) == 4 and pattern.count(EMPTY) == 1:
-                return 100
-            elif pattern.count(player) == 3 and pattern.count(EMPTY) == 2:
-                return 10
-            elif pattern.count(player) == 2 and pattern.count(EMPTY) == 3:
-                return 1
-            elif pattern.count(opponent) == 4 and pattern.count(EMPTY) == 1:
-                return -100
-            elif pattern.count(opponent) == 3 and pattern.count(EMPTY) == 2:
-                return -10
-            return 0
-        score = 0
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(BOARD_SIZE - 4):
-            for j in range(BOARD_SIZE):
-                pattern = [self.board[i+k][j] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(BOARD_SIZE - 4):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i+k][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(4, BOARD_SIZE):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i-k][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        score += random.randint(-3, 3)
-        return score
+        return self.window_scores["medium"]
 
     def evaluate_hard(self):
-        def score_pattern(pattern, player):
-            opponent = PLAYER if player == AI else AI
-            if pattern.count(player) == 5:
-                return 10000
-            elif pattern.count(player) == 4 and pattern.count(EMPTY) == 1:
-                return 1000 if EMPTY in [pattern[0], pattern[4]] else 500
-            elif pattern.count(player) == 3 and pattern.count(EMPTY) == 2:
-                empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
-                return 200 if 0 in empty_indices and 4 in empty_indices else 50
-            elif pattern.count(player) == 2 and pattern.count(EMPTY) == 3:
-                empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
-                return 10 if 0 in empty_indices and 4 in empty_indices else 5
-            elif pattern.count(opponent) == 4 and pattern.count(EMPTY) == 1:
-                return -1000
-            elif pattern.count(opponent) == 3 and pattern.count(EMPTY) == 2:
-                empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
-                return -200 if 0 in empty_indices and 4 in empty_indices else -50
-            elif pattern.count(opponent) == 2 and pattern.count(EMPTY) == 3:
-                empty_indices = [i for i, x in enumerate(pattern) if x == EMPTY]
-                return -10 if 0 in empty_indices and 4 in empty_indices else -5
-            return 0
-        score = 0
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(BOARD_SIZE - 4):
-            for j in range(BOARD_SIZE):
-                pattern = [self.board[i+k][j] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(BOARD_SIZE - 4):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i+k][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        for i in range(4, BOARD_SIZE):
-            for j in range(BOARD_SIZE - 4):
-                pattern = [self.board[i-k][j+k] for k in range(5)]
-                score += score_pattern(pattern, AI)
-        center = BOARD_SIZE // 2
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == AI:
-                    distance_from_center = max(abs(i - center), abs(j - center))
-                    score += (5 - distance_from_center) // 2
-        return score
+        return self.window_scores["hard"] + self.center_score
 
     def evaluate(self):
-        if self.difficulty == "Easy":
-            return self.evaluate_easy()
-        elif self.difficulty == "Medium":
-            return self.evaluate_medium()
-        return self.evaluate_hard()
-
-    def minimax(self, depth, alpha, beta, is_maximizing):
+        evaluator = DIFFICULTY_LEVELS[self.difficulty]["evaluator"]
+        if evaluator == "easy":
+            score = self.evaluate_easy()
+        elif evaluator == "medium":
+            score = self.evaluate_medium()
+        elif evaluator == "hard":
+            score = self.evaluate_hard()
+        else:
+            weights = DIFFICULTY_LEVELS[self.difficulty]["weights"]
+            score = self.window_scores[evaluator] + weights.get("center", 0) * self.center_score
+        jitter = DIFFICULTY_LEVELS[self.difficulty]["eval_jitter"]
+        return score + random.randint(-jitter, jitter) if jitter else score
+
+    def count_node(self):
+        self.nodes += 1
+        if self.node_limit is not None and (self.nodes > self.node_limit or time.time() > self.deadline):
+            raise _OutOfBudget()
+
+    def minimax(self, depth, alpha, beta, is_maximizing, allow_null=True):
+        self.count_node()
+        # Scores depend on the evaluator, so each difficulty gets its own keys
+        key = self.hash ^ DIFFICULTY_SALTS[self.difficulty] ^ RULES_SALTS[self.rules]
+        original_alpha, original_beta = alpha, beta
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, value, flag = entry
+            if flag == search_cache.EXACT:
+                return value
+            if flag == search_cache.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
         if self.is_winner(AI):
             return 1000 * (depth + 1)
         if self.is_winner(PLAYER):
             return -1000 * (depth + 1)
-        if self.is_full() or depth == 0:
+        if self.is_full():
             return self.evaluate()
-        legal_moves = self.get_smart_moves()
+        if depth == 0:
+            return self.quiescence(alpha, beta, is_maximizing)
+        if (allow_null and depth > NULL_MOVE_R and DIFFICULTY_LEVELS[self.difficulty]["null_move"]
+                and self.rules == rules.FREESTYLE
+                and (beta < float('inf') if is_maximizing else alpha > float('-inf'))
+                and self.null_move_cutoff(depth, alpha, beta, is_maximizing)):
+            return beta if is_maximizing else alpha
+        value = self._minimax_children(depth, alpha, beta, is_maximizing)
+        if value <= original_alpha:
+            flag = search_cache.UPPER
+        elif value >= original_beta:
+            flag = search_cache.LOWER
+        else:
+            flag = search_cache.EXACT
+        self.cache.put(key, depth, value, flag)
+        return value
+
+    def quiescence(self, alpha, beta, is_maximizing, budget=None):
+        """Static score, extended through forcing moves until the position is quiet."""
+        profile = DIFFICULTY_LEVELS[self.difficulty]
+        if budget is None:
+            budget = [profile["quiescence_nodes"]]
+        static = self.evaluate()
+        if budget[0] <= 0:
+            return static
+        side, opponent = (AI, PLAYER) if is_maximizing else (PLAYER, AI)
+        moves = self.get_smart_moves()
+        own = [self.threat_level(x, y, side) for x, y in moves]
+        if FIVE in own:
+            return 1000 if is_maximizing else -1000
+        theirs = [self.threat_level(x, y, opponent) for x, y in moves]
+        if FIVE in theirs:
+            # Standing pat would ignore the opponent's four, so only blocks count
+            forcing = [m for m, level in zip(moves, theirs) if level == FIVE]
+            best = float('-inf') if is_maximizing else float('inf')
+        else:
+            minimum = OPEN_THREE if profile["quiescence_threes"] else FOUR
+            forcing = [m for m, level in zip(moves, own) if level >= minimum]
+            best = static
+            if is_maximizing:
+                if static >= beta:
+                    return static
+                alpha = max(alpha, static)
+            else:
+                if static <= alpha:
+                    return static
+                beta = min(beta, static)
+        forcing = self.drop_forbidden(side, forcing)
+        if not forcing and FIVE in theirs:
+            # Under Renju every block can be forbidden to black, and then the five comes
+            return -1000 if is_maximizing else 1000
+        for x, y in forcing:
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+            self.count_node()
+            self.make_move(x, y, side, animate=False)
+            try:
+                value = self.quiescence(alpha, beta, not is_maximizing, budget)
+            finally:
+                self.undo_move(x, y)
+            if is_maximizing:
+                best = max(best, value)
+                alpha = max(alpha, value)
+            else:
+                best = min(best, value)
+                beta = min(beta, value)
+            if beta <= alpha:
+                break
+        return static if best in (float('inf'), float('-inf')) else best
+
+    def _minimax_children(self, depth, alpha, beta, is_maximizing):
+        profile = DIFFICULTY_LEVELS[self.difficulty]
+        side = AI if is_maximizing else PLAYER
+        legal_moves = self.get_candidate_moves(side, profile["width"], levels=True)
+        # Late quiet moves are searched a ply shallower first, and again at
+        # full depth only if they beat the best move so far
+        reduce_from = LMR_AFTER if profile["lmr"] and depth >= 2 else len(legal_moves)
         if is_maximizing:
             max_eval = float('-inf')
-            for move in legal_moves:
+            for i, (move, level) in enumerate(legal_moves):
                 x, y = move
                 self.make_move(x, y, AI, animate=False)
-                eval = self.minimax(depth - 1, alpha, beta, False)
-                self.undo_move(x, y)
+                try:
+                    if i >= reduce_from and level < OPEN_THREE and alpha > float('-inf'):
+                        eval = self.minimax(depth - 2, alpha, alpha + 1, False)
+                        if eval > alpha:
+                            eval = self.minimax(depth - 1, alpha, beta, False)
+                    else:
+                        eval = self.minimax(depth - 1, alpha, beta, False)
+                finally:
+                    self.undo_move(x, y)
                 max_eval = max(max_eval, eval)
                 alpha = max(alpha, eval)
                 if beta <= alpha:
@@ -578,54 +919,253 @@ class Gomoku:
             return max_eval
         else:
             min_eval = float('inf')
-            for move in legal_moves:
+            for i, (move, level) in enumerate(legal_moves):
                 x, y = move
                 self.make_move(x, y, PLAYER, animate=False)
-                eval = self.minimax(depth - 1, alpha, beta, True)
-                self.undo_move(x, y)
+                try:
+                    if i >= reduce_from and level < OPEN_THREE and beta < float('inf'):
+                        eval = self.minimax(depth - 2, beta - 1, beta, True)
+                        if eval < beta:
+                            eval = self.minimax(depth - 1, alpha, beta, True)
+                    else:
+                        eval = self.minimax(depth - 1, alpha, beta, True)
+                finally:
+                    self.undo_move(x, y)
                 min_eval = min(min_eval, eval)
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break
             return min_eval
 
+    def null_move_cutoff(self, depth, alpha, beta, is_maximizing):
+        """True if passing still fails high, so this node can be cut without searching moves.
+
+        Under freestyle rules stones never hurt their owner, so a pass is a
+        lower bound on the real moves unless the opponent is about to make
+        five. With exact fives or Renju an extra stone can spoil a five by
+        making an overline, or be forbidden, so minimax only tries this
+        under freestyle.
+        """
+        side, opponent = (AI, PLAYER) if is_maximizing else (PLAYER, AI)
+        if any(self.threat_level(x, y, opponent) == FIVE for x, y in self.get_smart_moves()):
+            return False
+        self.hash ^= NULL_MOVE_KEY
+        try:
+            if is_maximizing:
+                return self.minimax(depth - 1 - NULL_MOVE_R, beta - 1, beta, False, allow_null=False) >= beta
+            return self.minimax(depth - 1 - NULL_MOVE_R, alpha, alpha + 1, True, allow_null=False) <= alpha
+        finally:
+            self.hash ^= NULL_MOVE_KEY
+
     def get_smart_moves(self):
-        if not any(cell != EMPTY for row in self.board for cell in row):
+        if not self.stones:
             center = BOARD_SIZE // 2
             return [(center, center)]
-        moves = set()
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] != EMPTY:
-                    for di in range(-1, 2):
-                        for dj in range(-1, 2):
-                            if di == 0 and dj == 0:
-                                continue
-                            ni, nj = i + di, j + dj
-                            if 0 <= ni < BOARD_SIZE and 0 <= nj < BOARD_SIZE and self.board[ni][nj] == EMPTY:
-                                moves.add((ni, nj))
-        return list(moves) or self.get_legal_moves()
-
-    def get_best_move(self):
-        best_score = float('-inf')
-        best_move = None
-        depth = DIFFICULTY_LEVELS[self.difficulty]["depth"]
-        legal_moves = self.get_smart_moves()
-        random.shuffle(legal_moves)
-        for move in legal_moves:
+        grid = self.grid
+        cells = grid.cells
+        neighbours = self.neighbours
+        return ([grid.coords(idx) for idx in grid.playable if neighbours[idx] and cells[idx] == board.EMPTY]
+                or self.get_legal_moves())
+
+    def threat_level(self, x, y, player):
+        """Strongest line player would make by playing the empty cell (x, y): FIVE, OPEN_FOUR, FOUR, OPEN_THREE or 0."""
+        grid = self.grid
+        cells = grid.cells
+        idx = grid.index(x, y)
+        code = board.CODES[player]
+        overline = not rules.exact_five(self.rules, code)
+        level = 0
+        # Board.line, inlined: this runs for every candidate at every node
+        for step in grid.steps:
+            fwd = idx + step
+            while cells[fwd] == code:
+                fwd += step
+            back = idx - step
+            while cells[back] == code:
+                back -= step
+            count = (fwd - back) // step - 1
+            open_ends = (cells[fwd] == board.EMPTY) + (cells[back] == board.EMPTY)
+            if count == 5 or (count > 5 and overline):
+                return FIVE
+            if count == 4 and open_ends:
+                level = max(level, OPEN_FOUR if open_ends == 2 else FOUR)
+            elif count == 3 and open_ends == 2:
+                level = max(level, OPEN_THREE)
+        return level
+
+    def get_candidate_moves(self, side, width=0, levels=False):
+        """Smart moves, cut down to the forced ones when either side has a threat.
+
+        A win is played at once; an opponent five must be blocked; against an
+        opponent three (a move that would give them an open four) only the
+        blocking points and our own fours are searched. Otherwise, with a
+        width, only that many moves are kept, strongest threats and most
+        crowded cells first. With levels, (move, threat level) pairs are
+        returned in that order; forced moves count as FIVE.
+        """
+        moves = self.drop_forbidden(side, self.get_smart_moves())
+        if not (levels or (len(moves) > 1 and (self.forcing_moves or width))):
+            return moves
+        opponent = AI if side == PLAYER else PLAYER
+        own = [self.threat_level(x, y, side) for x, y in moves]
+        theirs = [self.threat_level(x, y, opponent) for x, y in moves]
+        forced = None
+        if self.forcing_moves:
+            if FIVE in own:
+                forced = [m for m, level in zip(moves, own) if level == FIVE]
+            elif FIVE in theirs:
+                forced = [m for m, level in zip(moves, theirs) if level == FIVE]
+            elif OPEN_FOUR in theirs:
+                forced = [m for m, mine, level in zip(moves, own, theirs) if level == OPEN_FOUR or mine >= FOUR]
+        if forced is not None:
+            return [(m, FIVE) for m in forced] if levels else forced
+        keys = [(max(mine, level), mine) for mine, level in zip(own, theirs)]
+        order = range(len(moves))
+        if width or levels:
+            ranked = [key + (self.neighbour_count(x, y),) for key, (x, y) in zip(keys, moves)]
+            order = sorted(order, key=ranked.__getitem__, reverse=True)[:width or None]
+        if levels:
+            return [(moves[i], keys[i][0]) for i in order]
+        return [moves[i] for i in order]
+
+    def neighbour_count(self, x, y):
+        return self.neighbours[self.grid.index(x, y)]
+
+    def score_moves(self, side=AI, depth=None, moves=None, scored=None):
+        """Search each candidate for side; scores are from the AI's point of view.
+
+        Without a budget this searches to the profile's full depth. Results are
+        appended to scored, so a caller keeps the moves finished before a
+        budget runs out.
+        """
+        profile = DIFFICULTY_LEVELS[self.difficulty]
+        depth = profile["depth"] if depth is None else depth
+        if moves is None:
+            moves = self.get_candidate_moves(side, profile["width"])
+            random.shuffle(moves)
+        scored = [] if scored is None else scored
+        for move in moves:
             x, y = move
-            self.make_move(x, y, AI, animate=False)
-            score = self.minimax(depth, float('-inf'), float('inf'), False)
+            self.make_move(x, y, side, animate=False)
+            try:
+                score = self.minimax(depth, float('-inf'), float('inf'), side == PLAYER)
+            finally:
+                self.undo_move(x, y)
+            scored.append((move, score))
+        self.search_depth = depth
+        return scored
+
+    def search(self, side=AI):
+        """Deepen iteratively within the profile's node and time budgets.
+
+        Returns [(move, score)] from the deepest finished iteration, best
+        first, or the moves scored so far if even the first one ran out.
+        """
+        profile = DIFFICULTY_LEVELS[self.difficulty]
+        last_move = self.last_move
+        self.nodes = 0
+        self.node_limit = profile["nodes"]
+        self.deadline = time.time() + profile["time"]
+        start = time.time()
+        moves = self.get_candidate_moves(side, profile["width"])
+        random.shuffle(moves)
+        completed, depth, iterations = [], None, []
+        try:
+            for d in range(profile["depth"] + 1):
+                scored = []
+                self.score_moves(side, d, moves, scored)
+                completed, depth = scored, d
+                iterations.append((d, self.nodes))
+                # Search the best moves first next time so cutoffs come early
+                completed.sort(key=lambda item: item[1], reverse=side == AI)
+                moves = [move for move, _ in completed]
+        except _OutOfBudget:
+            # Every make_move in the search is undone on the way out, but undo_move leaves last_move
+            self.last_move = last_move
+            if not completed:
+                completed = scored or [(move, 0) for move in moves[:1]]
+        finally:
+            self.node_limit = self.deadline = None
+        self.search_depth = depth
+        self.search_stats = {"nodes": min(self.nodes, profile["nodes"]), "depth": depth,
+                             "seconds": time.time() - start, "iterations": iterations}
+        return completed
+
+    def principal_variation(self, move, side, length=None):
+        """Follow the best cached replies after side plays move; call right after score_moves.
+
+        Only exact entries are followed: a bound says nothing about which reply is best.
+        """
+        length = length or (self.search_depth or 0) + 1
+        salt = DIFFICULTY_SALTS[self.difficulty] ^ RULES_SALTS[self.rules]
+        pv = [move]
+        self.make_move(move[0], move[1], side, animate=False)
+        while len(pv) < length and not self.is_winner(side):
+            side = AI if side == PLAYER else PLAYER
+            best, best_score = None, None
+            for x, y in self.get_smart_moves():
+                self.make_move(x, y, side, animate=False)
+                # Won positions are never cached, so check for a win first
+                if self.is_winner(side):
+                    score = float('inf')
+                else:
+                    entry = self.cache.get(self.hash ^ salt)
+                    if entry is None or entry[2] != search_cache.EXACT:
+                        score = None
+                    else:
+                        score = entry[1] if side == AI else -entry[1]
+                self.undo_move(x, y)
+                if score is None:
+                    continue
+                if best_score is None or score > best_score:
+                    best, best_score = (x, y), score
+            if best is None:
+                break
+            pv.append(best)
+            self.make_move(best[0], best[1], side, animate=False)
+        for x, y in reversed(pv):
             self.undo_move(x, y)
-            if self.difficulty == "Easy":
-                score += random.randint(-100, 100)
-            elif self.difficulty == "Medium":
-                score += random.randint(-30, 30)
+        self.winner_line = None
+        return pv
+
+    def get_best_move(self, side=AI):
+        """Move for side; with minimax, search_stats["score"] is its score from side's point of view."""
+        # MCTS playouts know nothing of forbidden points, so Renju always uses minimax
+        if self.engine == "mcts" and self.rules != rules.RENJU:
+            return self.get_best_move_mcts(side)
+        best_score = float('-inf')
+        best_move = None
+        jitter = DIFFICULTY_LEVELS[self.difficulty]["move_jitter"]
+        sign = 1 if side == AI else -1
+        scored = self.search(side)
+        for move, score in scored:
+            score *= sign
+            if jitter:
+                score += random.randint(-jitter, jitter)
             if score > best_score:
                 best_score = score
                 best_move = move
+        if best_move is not None:
+            self.search_stats["score"] = dict(scored)[best_move] * sign
         return best_move
 
+    def get_best_move_mcts(self, side=AI):
+        if self.mcts_engine is None:
+            self.mcts_engine = mcts.MCTSEngine(workers=MCTS_WORKERS)
+        self.mcts_engine.time_limit = DIFFICULTY_LEVELS[self.difficulty]["mcts_time"]
+        return self.mcts_engine.search(self, side, exact=self.rules == rules.STANDARD)
+
+    def record_game(self):
+        if self.recorder is not None and self.stones:
+            self.recorder.write(records.GameRecord.from_game(self))
+
+    def close(self):
+        if self.game_state == "playing":
+            self.record_game()
+        if self.mcts_engine is not None:
+            self.mcts_engine.close()
+
+    @profiler.timed()
     def ai_move(self):
         if self.game_state != "playing":
             return
@@ -633,12 +1173,17 @@ class Gomoku:
         if move:
             x, y = move
             self.make_move(x, y, AI)
+            audio.emit("stone_placed")
             if self.is_winner(AI):
-                self.game_state = "ai_win"
-                self.show_modal = True
+                self.end_game("ai_win")
             elif self.is_full():
-                self.game_state = "draw"
-                self.show_modal = True
+                self.end_game("draw")
+
+    def end_game(self, state):
+        self.game_state = state
+        self.show_modal = True
+        self.record_game()
+        audio.emit(state)
 
     def handle_click(self, pos):
         if self.show_modal:
@@ -656,17 +1201,32 @@ class Gomoku:
             return
         x = (pos[1] - MARGIN_TOP + CELL_SIZE // 2) // CELL_SIZE
         y = (pos[0] - MARGIN_LEFT + CELL_SIZE // 2) // CELL_SIZE
-        if self.is_valid_move(x, y):
+        if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE and self.board[x][y] == EMPTY and self.is_forbidden(x, y, PLAYER):
+            self.solve_message = "Forbidden point: no double three, double four or overline"
+        elif self.is_valid_move(x, y):
             self.make_move(x, y, PLAYER)
+            audio.emit("stone_placed")
             if self.is_winner(PLAYER):
-                self.game_state = "player_win"
-                self.show_modal = True
+                self.end_game("player_win")
             elif self.is_full():
-                self.game_state = "draw"
-                self.show_modal = True
+                self.end_game("draw")
             else:
                 pygame.time.set_timer(pygame.USEREVENT, 300)  # Reduced delay for faster AI response
 
+    @profiler.timed()
+    def solve_position(self, time_limit=3.0):
+        if self.game_state != "playing":
+            return None
+        result = solver.solve(self, time_limit=time_limit)
+        side = "You" if result.attacker == PLAYER else "AI"
+        if result.status == "proven":
+            self.solve_message = f"{side}: forced win starting at {result.move} ({len(result.pv)} plies)"
+        elif result.status == "disproven":
+            self.solve_message = f"{side}: no forced win by threats"
+        else:
+            self.solve_message = f"{side}: unsolved after {result.nodes} nodes"
+        return result
+
     def update_hover(self, pos):
         x = (pos[1] - MARGIN_TOP + CELL_SIZE // 2) // CELL_SIZE
         y = (pos[0] - MARGIN_LEFT + CELL_SIZE // 2) // CELL_SIZE
@@ -678,6 +1238,16 @@ class GameManager:
         self.game = None
         self.ai_thinking = False
         self.selected_difficulty = "Medium"
+        self.selected_engine = "minimax"
+        self.selected_rules = DEFAULT_RULES
+        self.search_cache = search_cache.SearchCache(CACHE_BYTES, BOARD_SIZE)
+        stone_atlas()
+        self.recorder = records.RecordWriter(RECORD_FILE) if RECORD_FILE else None
+        self.dirty_rendering = True
+        self.frame_cpu = {True: [0, 0.0], False: [0, 0.0]}  # frames and CPU seconds per render mode
+        self.hud_rect = None
+        if CACHE_FILE:
+            self.search_cache.load(CACHE_FILE)
 
         # Layout constants
         title_y = 100  # Move GOMOKU to top
@@ -740,42 +1310,36 @@ class GameManager:
         self.title_y = title_y
         self.subtitle_y = subtitle_y
         self.tip_y = WINDOW_HEIGHT - 30
+        self.last_ball_update = time.time()
+        self.last_input = time.time()
+        self.adaptive_frames = True
 
+    @profiler.timed()
     def draw_static_background(self):
-        top_color = (30, 50, 80)
-        bottom_color = (15, 25, 45)
-        check_size = 40
-        for y in range(WINDOW_HEIGHT):
-            ratio = y / WINDOW_HEIGHT
-            r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
-            g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
-            b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
-            pygame.draw.line(screen, (r, g, b), (0, y), (WINDOW_WIDTH, y))
-
-        check_color = (255, 255, 255, 10)
-        check_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        for x in range(0, WINDOW_WIDTH, check_size):
-            for y in range(0, WINDOW_HEIGHT, check_size):
-                pygame.draw.rect(check_surface, check_color, (x, y, check_size, check_size), 1)
-        screen.blit(check_surface, (0, 0))
+        screen.blit(render_cache.surface("menu_background", build_menu_background), (0, 0))
 
+        # Ball speeds are per 60 FPS frame; scale by elapsed time so the rate can vary
+        now = time.time()
+        steps = min(10.0, (now - self.last_ball_update) * FPS)
+        self.last_ball_update = now
         for ball in self.balls:
             pygame.draw.circle(screen, ball["color"], (int(ball["x"]), int(ball["y"])), ball["radius"])
-            ball["x"] += ball["dx"]
-            ball["y"] += ball["dy"]
+            ball["x"] += ball["dx"] * steps
+            ball["y"] += ball["dy"] * steps
             if not (0 <= ball["x"] <= WINDOW_WIDTH):
                 ball["dx"] *= -1
             if not (0 <= ball["y"] <= WINDOW_HEIGHT):
                 ball["dy"] *= -1
 
+    @profiler.timed()
     def draw_menu(self):
         self.draw_static_background()
 
-        title_surface = title_font.render("GOMOKU", True, TITLE_COLOR)
+        title_surface = render_cache.text(font("title"), "GOMOKU", TITLE_COLOR)
         title_rect = title_surface.get_rect(center=(WINDOW_WIDTH // 2, self.title_y))
         screen.blit(title_surface, title_rect)
 
-        subtitle_surface = game_font.render("Select Difficulty", True, (200, 220, 240))
+        subtitle_surface = render_cache.text(font("game"), "Select Difficulty", (200, 220, 240))
         subtitle_rect = subtitle_surface.get_rect(center=(WINDOW_WIDTH // 2, self.subtitle_y))
         screen.blit(subtitle_surface, subtitle_rect)
 
@@ -792,19 +1356,68 @@ class GameManager:
         self.play_button.update(mouse_pos)
         self.play_button.draw(screen)
 
-        tip_surface = status_font.render("Tip: Connect 5 in a row to win!", True, (180, 200, 220))
+        engine_name = "Monte Carlo" if self.selected_engine == "mcts" else "Minimax"
+        tip_surface = render_cache.text(font("status"), f"Tip: Connect 5 in a row to win!   Engine: {engine_name} (E)   "
+                                                     f"Rules: {self.selected_rules.capitalize()} (R)", (180, 200, 220))
         tip_rect = tip_surface.get_rect(center=(WINDOW_WIDTH // 2, self.tip_y))
         screen.blit(tip_surface, tip_rect)
 
     def update(self):
+        cpu_start = time.process_time()
         if self.state == "menu":
             self.draw_menu()
+            if profiler.show_hud:
+                profiler.draw_hud(screen, font("status"))
+            pygame.display.flip()
         elif self.state == "playing":
-            self.game.draw_board()
-        pygame.display.flip()
+            rects = self.game.draw_board(self.dirty_rendering, [self.hud_rect])
+            if profiler.show_hud:
+                self.hud_rect = profiler.draw_hud(screen, font("status"))
+                if rects is not None:
+                    rects.append(self.hud_rect)
+            else:
+                self.hud_rect = None
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+            stats = self.frame_cpu[self.dirty_rendering]
+            stats[0] += 1
+            stats[1] += time.process_time() - cpu_start
+
+    def cpu_report(self):
+        lines = []
+        for mode, (frames, seconds) in self.frame_cpu.items():
+            if frames:
+                name = "dirty rects" if mode else "full redraw"
+                lines.append(f"{name}: {frames} frames, {seconds / frames * 1000:.2f} ms CPU/frame")
+        return lines
+
+    def frame_interval(self):
+        """Seconds the next frame can wait if no input arrives."""
+        if not self.adaptive_frames:
+            return 1.0 / FPS
+        if self.state == "playing" and any(stone.radius < stone.max_radius for stone in self.game.stones):
+            return 1.0 / FPS
+        if time.time() - self.last_input < IDLE_AFTER:
+            return 1.0 / AMBIENT_FPS
+        return 1.0
+
+    async def handle_events(self, events=()):
+        with profiler.stage("events"):
+            running = self.process_events(events)
+        if not running:
+            return False
+        if self.state == "playing" and self.game.game_state == "playing" and len(self.game.stones) % 2 == 1 and self.ai_thinking:
+            self.game.ai_move()
+            self.ai_thinking = False
 
-    async def handle_events(self):
-        for event in pygame.event.get():
+        return running
+
+    def process_events(self, events=()):
+        for event in list(events) + pygame.event.get():
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.KEYDOWN):
+                self.last_input = time.time()
             if event.type == pygame.QUIT:
                 return False
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -815,30 +1428,91 @@ class GameManager:
                             break
                     if self.play_button.is_clicked(event.pos, True):
                         self.state = "playing"
-                        self.game = Gomoku()
+                        self.game = Gomoku(self.search_cache)
                         self.game.difficulty = self.selected_difficulty
+                        self.game.engine = self.selected_engine
+                        self.game.rules = self.selected_rules
+                        self.game.recorder = self.recorder
                 elif self.state == "playing":
                     self.game.handle_click(event.pos)
             elif event.type == pygame.MOUSEMOTION:
                 if self.state == "playing":
                     self.game.update_hover(event.pos)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_e and self.state == "menu":
+                index = ENGINES.index(self.selected_engine)
+                self.selected_engine = ENGINES[(index + 1) % len(ENGINES)]
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r and self.state == "menu":
+                index = rules.RULES.index(self.selected_rules)
+                self.selected_rules = rules.RULES[(index + 1) % len(rules.RULES)]
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.show_hud = not profiler.show_hud
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                if profiler.recording:
+                    frames = profiler.export_csv(PROFILE_TRACE_FILE)
+                    print(f"Wrote {frames} frames to {PROFILE_TRACE_FILE}")
+                profiler.recording = not profiler.recording
+                profiler.trace = []
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                self.dirty_rendering = not self.dirty_rendering
+                if self.game:
+                    self.game.drawn = None
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                if self.state == "playing" and not self.ai_thinking:
+                    self.game.solve_position()
             elif event.type == pygame.USEREVENT and not self.ai_thinking and self.state == "playing":
                 pygame.time.set_timer(pygame.USEREVENT, 0)
                 self.ai_thinking = True
 
-        if self.state == "playing" and self.game.game_state == "playing" and len(self.game.stones) % 2 == 1 and self.ai_thinking:
-            self.game.ai_move()
-            self.ai_thinking = False
-
         return True
 
-async def main():
-    manager = GameManager()
+async def wait_for_events(timeout):
+    """Wait up to timeout seconds for input; returns any event taken off the queue."""
+    if platform.system() == "Emscripten":
+        # The browser owns the thread, so poll cooperatively instead of blocking
+        deadline = time.time() + timeout
+        while not pygame.event.peek():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 1.0 / FPS))
+        return []
+    event = pygame.event.wait(max(1, int(timeout * 1000)))
+    return [] if event.type == pygame.NOEVENT else [event]
+
+async def run(manager, duration=None):
     running = True
+    events = []
+    start = time.time()
     while running:
+        frame_start = time.time()
+        profiler.begin_frame()
         manager.update()
-        running = await manager.handle_events()
-        await asyncio.sleep(1.0 / FPS)
+        running = await manager.handle_events(events)
+        audio.dispatch()
+        profiler.end_frame()
+        audio.start()
+        if duration is not None and time.time() - start >= duration:
+            break
+        # Never exceed FPS, even when input arrives faster than that
+        await asyncio.sleep(max(0.0, frame_start + 1.0 / FPS - time.time()))
+        events = await wait_for_events(max(0.0, frame_start + manager.frame_interval() - time.time()))
+
+async def main():
+    manager = GameManager()
+    await run(manager)
+    if manager.game:
+        manager.game.close()
+    if manager.recorder:
+        manager.recorder.close()
+    if CACHE_FILE:
+        manager.search_cache.save(CACHE_FILE)
+    for line in manager.cpu_report():
+        print(line)
+    if profiler.recording:
+        profiler.export_csv(PROFILE_TRACE_FILE)
+    if profiler.frame_count:
+        for line in profiler.summary():
+            print(line)
     pygame.quit()
 
 if platform.system() == "Emscripten":
@@ -0,0 +1,40 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+def parse_moves(text):
+    """Parse "x,y x,y ..." into a list of (x, y) tuples."""
+    moves = []
+    for token in text.replace(";", " ").split():
+        x, y = token.split(",")
+        moves.append((int(x), int(y)))
+    return moves
+
+
+def new_game(moves=(), difficulty="Medium", cache=None):
+    """Create a Gomoku without a visible window and replay moves, player first."""
+    import gomoku8
+    game = gomoku8.Gomoku(cache)
+    game.difficulty = difficulty
+    game.show_difficulty_modal = False
+    load_position(game, moves)
+    return game
+
+
+def load_position(game, moves):
+    """Reset game's board to the position after moves, without animation or sound."""
+    import gomoku8
+    game.clear_position()
+    game.stones = []
+    game.last_move = None
+    game.winner_line = None
+    game.game_state = "playing"
+    for i, (x, y) in enumerate(moves):
+        player = gomoku8.PLAYER if i % 2 == 0 else gomoku8.AI
+        game.set_cell(x, y, player)
+        game.stones.append(gomoku8.Stone(x, y, player, animate=False))
+        game.last_move = (x, y, player)
+    return game
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import random
+import sys
+import time
+
+from server import BOARD_SIZE, EMPTY, PLAYER
+
+
+class Client:
+    """A simulated player: opens games against the AI and plays random nearby moves."""
+
+    def __init__(self, host, port, difficulty, engine, seed):
+        self.host = host
+        self.port = port
+        self.difficulty = difficulty
+        self.engine = engine
+        self.random = random.Random(seed)
+        self.latencies = []
+        self.moves = 0
+        self.games = 0
+        self.errors = 0
+
+    async def request(self, reader, writer, message):
+        writer.write((json.dumps(message) + "\n").encode())
+        await writer.drain()
+        return await self.read(reader)
+
+    @staticmethod
+    async def read(reader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def pick(self, board):
+        empty = [i for i, cell in enumerate(board) if cell == EMPTY]
+        near = [i for i in empty if any(board[j] != EMPTY for j in _neighbours(i))]
+        return divmod(self.random.choice(near or empty), BOARD_SIZE)
+
+    async def run(self, deadline):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                created = await self.request(reader, writer, {"op": "new", "mode": "ai", "difficulty": self.difficulty,
+                                                              "engine": self.engine})
+                game_id = created["game"]
+                board = [EMPTY] * (BOARD_SIZE * BOARD_SIZE)
+                self.games += 1
+                state = "playing"
+                while state == "playing" and time.perf_counter() < deadline:
+                    x, y = self.pick(board)
+                    sent = time.perf_counter()
+                    reply = await self.request(reader, writer, {"op": "move", "game": game_id, "x": x, "y": y})
+                    if reply["event"] == "error":
+                        self.errors += 1
+                        break
+                    board[x * BOARD_SIZE + y] = PLAYER
+                    self.moves += 1
+                    state = reply["state"]
+                    if state != "playing":
+                        break
+                    reply = await self.read(reader)
+                    self.latencies.append(time.perf_counter() - sent)
+                    board[reply["x"] * BOARD_SIZE + reply["y"]] = reply["side"]
+                    self.moves += 1
+                    state = reply["state"]
+                if state == "playing":
+                    await self.request(reader, writer, {"op": "resign", "game": game_id})
+        finally:
+            writer.close()
+
+
+def _neighbours(idx):
+    x, y = divmod(idx, BOARD_SIZE)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            nx, ny = x + dx, y + dy
+            if (dx or dy) and 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
+                yield nx * BOARD_SIZE + ny
+
+
+async def run_load(host="127.0.0.1", port=8765, clients=50, duration=10.0, difficulty="Easy", engine="minimax"):
+    start = time.perf_counter()
+    deadline = start + duration
+    players = [Client(host, port, difficulty, engine, seed) for seed in range(clients)]
+    results = await asyncio.gather(*(p.run(deadline) for p in players), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if isinstance(r, Exception)]
+    latencies = sorted(l for p in players for l in p.latencies)
+    moves = sum(p.moves for p in players)
+    pct = {q: latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))] * 1000 if latencies else 0.0
+           for q in (50, 99)}
+    print(f"{clients} clients, {sum(p.games for p in players)} games, {moves} moves in {elapsed:.1f}s")
+    print(f"{moves / elapsed:.1f} moves/s, AI move latency p50 {pct[50]:.1f} ms, p99 {pct[99]:.1f} ms")
+    if failures or any(p.errors for p in players):
+        print(f"{len(failures)} clients failed ({failures[0] if failures else 'rejected moves'}), "
+              f"{sum(p.errors for p in players)} rejected moves")
+    return moves / elapsed, pct[99]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test a running server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-c", "--clients", type=int, default=50, help="concurrent connections, one game each")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--difficulty", default="Easy")
+    parser.add_argument("--engine", default="minimax")
+    args = parser.parse_args(argv)
+    asyncio.run(run_load(args.host, args.port, args.clients, args.duration, args.difficulty, args.engine))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
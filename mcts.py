@@ -0,0 +1,286 @@
+import math
+import multiprocessing
+import platform
+import random
+import time
+
+# Board markers, kept in sync with gomoku7.py / gomoku8.py
+EMPTY = '.'
+PLAYER = 'X'
+AI = 'O'
+
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+
+def other(side):
+    return AI if side == PLAYER else PLAYER
+
+
+def is_five(board, size, idx, side, exact=True):
+    """Five through idx on a flat board; exact (standard rules) rejects six or more in a row."""
+    x, y = divmod(idx, size)
+    for dx, dy in DIRECTIONS:
+        count = 1
+        nx, ny = x + dx, y + dy
+        while 0 <= nx < size and 0 <= ny < size and board[nx * size + ny] == side:
+            count += 1
+            nx, ny = nx + dx, ny + dy
+        nx, ny = x - dx, y - dy
+        while 0 <= nx < size and 0 <= ny < size and board[nx * size + ny] == side:
+            count += 1
+            nx, ny = nx - dx, ny - dy
+        if count == 5 or (count > 5 and not exact):
+            return True
+    return False
+
+
+def neighbours(size, idx):
+    x, y = divmod(idx, size)
+    result = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            nx, ny = x + dx, y + dy
+            if (dx or dy) and 0 <= nx < size and 0 <= ny < size:
+                result.append(nx * size + ny)
+    return result
+
+
+def local_moves(board, size):
+    moves = set()
+    for idx, cell in enumerate(board):
+        if cell != EMPTY:
+            for n in neighbours(size, idx):
+                if board[n] == EMPTY:
+                    moves.add(n)
+    if not moves and board[(size // 2) * size + size // 2] == EMPTY:
+        moves.add((size // 2) * size + size // 2)
+    return moves
+
+
+def playout(cells, size, side, seed=None, exact=True):
+    """Random game from cells with side to move; returns the winner or None for a draw."""
+    rng = random.Random(seed)
+    board = list(cells)
+    candidates = list(local_moves(board, size))
+    in_candidates = set(candidates)
+    while True:
+        if not candidates:
+            empties = [i for i, c in enumerate(board) if c == EMPTY]
+            if not empties:
+                return None
+            candidates = empties
+            in_candidates = set(empties)
+        i = rng.randrange(len(candidates))
+        idx = candidates[i]
+        candidates[i] = candidates[-1]
+        candidates.pop()
+        in_candidates.discard(idx)
+        board[idx] = side
+        if is_five(board, size, idx, side, exact):
+            return side
+        for n in neighbours(size, idx):
+            if board[n] == EMPTY and n not in in_candidates:
+                in_candidates.add(n)
+                candidates.append(n)
+        side = other(side)
+
+
+def _playout_job(args):
+    return playout(*args)
+
+
+class Node:
+    __slots__ = ("move", "side", "parent", "children", "untried", "visits", "wins", "winner")
+
+    def __init__(self, move, side, parent=None, winner=None):
+        self.move = move          # flat index of the move leading here, None at the root
+        self.side = side          # player who made that move
+        self.parent = parent
+        self.children = {}
+        self.untried = None       # candidate moves, best first, generated on first expansion
+        self.visits = 0
+        self.wins = 0.0           # from the point of view of self.side
+        self.winner = winner
+
+
+class MCTSEngine:
+    """UCT search with progressive widening and tree reuse across turns.
+
+    With workers > 1, leaves are selected in batches under virtual loss and
+    their playouts run in a process pool. Fives follow standard rules, or
+    freestyle with exact=False; Renju's forbidden points are not modelled.
+    """
+
+    def __init__(self, time_limit=1.0, exploration=1.2, widening=2.0, widening_exponent=0.5,
+                 workers=1, batch_size=None, max_iterations=None, seed=None):
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.widening = widening
+        self.widening_exponent = widening_exponent
+        self.workers = workers if platform.system() != "Emscripten" else 1
+        self.batch_size = batch_size or self.workers * 4
+        self.max_iterations = max_iterations
+        self.rng = random.Random(seed)
+        self.root = None
+        self.history = []
+        self.size = 0
+        self.exact = True
+        self.pool = None
+        self.last_stats = {}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self.pool = context.Pool(self.workers)
+        return self.pool
+
+    def _sync_root(self, board, history, side, exact):
+        """Reuse the subtree for the current position if it follows from the last search."""
+        size = len(board)
+        reused = 0
+        if (self.root is not None and size == self.size and exact == self.exact
+                and history[:len(self.history)] == self.history):
+            node = self.root
+            for x, y in history[len(self.history):]:
+                node = node.children.get(x * size + y)
+                if node is None:
+                    break
+            if node is not None:
+                node.parent = None
+                self.root = node
+                reused = node.visits
+        if reused == 0:
+            self.root = Node(None, other(side))
+        self.size = size
+        self.exact = exact
+        self.history = list(history)
+        return reused
+
+    def _generate(self, board, side):
+        size = self.size
+        moves = local_moves(board, size)
+        for idx in moves:
+            board[idx] = side
+            won = is_five(board, size, idx, side, self.exact)
+            board[idx] = EMPTY
+            if won:
+                return [idx]
+        opponent = other(side)
+        blocks = []
+        for idx in moves:
+            board[idx] = opponent
+            if is_five(board, size, idx, opponent, self.exact):
+                blocks.append(idx)
+            board[idx] = EMPTY
+        if blocks:
+            return blocks
+
+        def priority(idx):
+            return sum(1 for n in neighbours(size, idx) if board[n] != EMPTY) + self.rng.random()
+        return sorted(moves, key=priority, reverse=True)
+
+    def _select(self, board):
+        """Descend from the root, expanding one child; returns (path, leaf side to move)."""
+        node = self.root
+        path = [node]
+        side = other(node.side)
+        while node.winner is None:
+            if node.untried is None:
+                node.untried = self._generate(board, side)
+                if not node.untried and not node.children:
+                    break
+            allowed = math.ceil(self.widening * (node.visits + 1) ** self.widening_exponent)
+            if node.untried and len(node.children) < allowed:
+                idx = node.untried.pop(0)
+                board[idx] = side
+                winner = side if is_five(board, self.size, idx, side, self.exact) else None
+                child = Node(idx, side, node, winner)
+                node.children[idx] = child
+                path.append(child)
+                return path, other(side)
+            if not node.children:
+                break
+            log_n = math.log(node.visits + 1)
+            c = self.exploration
+            node = max(node.children.values(),
+                       key=lambda ch: ch.wins / (ch.visits + 1e-9) + c * math.sqrt(log_n / (ch.visits + 1e-9)))
+            board[node.move] = side
+            path.append(node)
+            side = other(side)
+        return path, side
+
+    def _backpropagate(self, path, winner, count_visit=True):
+        for node in path:
+            if count_visit:
+                node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.side:
+                node.wins += 1
+
+    def search(self, game, side=AI, exact=True):
+        """Return the best move (x, y) for side in game's current position."""
+        board_2d = game.board
+        size = len(board_2d)
+        history = [(s.grid_x, s.grid_y) for s in game.stones]
+        reused = self._sync_root(board_2d, history, side, exact)
+        cells = [cell for row in board_2d for cell in row]
+        start = time.time()
+        iterations = 0
+        while True:
+            if self.workers > 1:
+                iterations += self._parallel_batch(cells)
+            else:
+                board = list(cells)
+                path, to_move = self._select(board)
+                leaf = path[-1]
+                if leaf.winner is not None:
+                    winner = leaf.winner
+                elif EMPTY not in board:
+                    winner = None
+                else:
+                    winner = playout(board, size, to_move, self.rng.random(), self.exact)
+                self._backpropagate(path, winner)
+                iterations += 1
+            if self.max_iterations and iterations >= self.max_iterations:
+                break
+            if time.time() - start >= self.time_limit and iterations > 0:
+                break
+        elapsed = time.time() - start
+        self.last_stats = {
+            "iterations": iterations,
+            "reused_visits": reused,
+            "elapsed": elapsed,
+            "playouts_per_sec": iterations / elapsed if elapsed else 0.0,
+        }
+        if not self.root.children:
+            moves = self._generate(list(cells), side)
+            return divmod(moves[0], size) if moves else None
+        best = max(self.root.children.values(), key=lambda ch: ch.visits)
+        return divmod(best.move, size)
+
+    def _parallel_batch(self, cells):
+        # Virtual loss: count the visit up front so concurrent selections spread out
+        jobs = []
+        pending = []
+        for _ in range(self.batch_size):
+            board = list(cells)
+            path, to_move = self._select(board)
+            leaf = path[-1]
+            for node in path:
+                node.visits += 1
+            if leaf.winner is not None or EMPTY not in board:
+                self._backpropagate(path, leaf.winner, count_visit=False)
+                continue
+            pending.append(path)
+            jobs.append((board, self.size, to_move, self.rng.random(), self.exact))
+        for path, winner in zip(pending, self._get_pool().map(_playout_job, jobs)):
+            self._backpropagate(path, winner, count_visit=False)
+        return self.batch_size
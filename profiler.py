@@ -0,0 +1,124 @@
+import csv
+import functools
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    """Per-stage frame timings with rolling percentiles and an optional CSV trace.
+
+    Stages are timed with the timed() decorator or the stage() context
+    manager; calls in the same frame accumulate. Everything is a no-op
+    until the HUD or recording is switched on.
+    """
+
+    def __init__(self, window=300):
+        self.show_hud = False
+        self.recording = False
+        self.frame_times = deque(maxlen=window)
+        self.stage_times = {}
+        self.current = {}
+        self.trace = []
+        self.frame_start = None
+        self.frame_count = 0
+
+    @property
+    def enabled(self):
+        return self.show_hud or self.recording
+
+    def begin_frame(self):
+        if not self.enabled:
+            self.frame_start = None
+            return
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.frame_start = None
+        self.frame_count += 1
+        self.frame_times.append(frame_ms)
+        for name, ms in self.current.items():
+            self.stage_times.setdefault(name, deque(maxlen=self.frame_times.maxlen)).append(ms)
+        if self.recording:
+            self.trace.append((self.frame_count, time.time(), frame_ms, self.current))
+
+    def add(self, name, ms):
+        self.current[name] = self.current.get(name, 0.0) + ms
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def timed(self, name=None):
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.frame_start is None:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(stage_name, (time.perf_counter() - start) * 1000)
+            return wrapper
+        return decorator
+
+    def percentiles(self, values=None, points=(50, 95, 99)):
+        ordered = sorted(self.frame_times if values is None else values)
+        if not ordered:
+            return {p: 0.0 for p in points}
+        return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+    def summary(self):
+        pct = self.percentiles()
+        lines = [f"frame p50 {pct[50]:.2f}  p95 {pct[95]:.2f}  p99 {pct[99]:.2f} ms"]
+        for name, values in sorted(self.stage_times.items(), key=lambda kv: -sum(kv[1])):
+            lines.append(f"{name:<22} avg {sum(values) / len(values):6.2f}  p95 {self.percentiles(values)[95]:6.2f} ms")
+        return lines
+
+    def draw_hud(self, surface, font, pos=(10, 10)):
+        """Draw the summary in a translucent box; returns the rect it covers."""
+        import pygame
+
+        lines = self.summary()
+        if self.recording:
+            lines.append(f"recording: {len(self.trace)} frames")
+        rendered = [font.render(line, True, (230, 230, 230)) for line in lines]
+        width = max(s.get_width() for s in rendered) + 16
+        height = sum(s.get_height() for s in rendered) + 12
+        box = pygame.Surface((width, height), pygame.SRCALPHA)
+        box.fill((0, 0, 0, 180))
+        y = 6
+        for s in rendered:
+            box.blit(s, (8, y))
+            y += s.get_height()
+        return surface.blit(box, pos)
+
+    def export_csv(self, path):
+        stages = sorted({name for _, _, _, current in self.trace for name in current})
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "timestamp", "frame_ms"] + stages)
+            for frame, timestamp, frame_ms, current in self.trace:
+                writer.writerow([frame, f"{timestamp:.6f}", f"{frame_ms:.3f}"] +
+                                [f"{current.get(name, 0.0):.3f}" for name in stages])
+        return len(self.trace)
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter() if self.profiler.frame_start is not None else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.profiler.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
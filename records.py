@@ -0,0 +1,300 @@
+import calendar
+import mmap
+import os
+import sys
+import time
+
+# Board markers, kept in sync with gomoku7.py / gomoku8.py
+PLAYER = 'X'
+AI = 'O'
+
+MAGIC = b"GMKR\x01"
+RULES = ["standard", "freestyle", "renju"]   # kept in sync with rules.RULES
+RESULTS = [None, PLAYER, AI, "draw"]   # None: unfinished
+
+
+class GameRecord:
+    """One game: settings, result and moves as (x, y), player first."""
+
+    def __init__(self, board_size, moves, result=None, rules="standard", engine="minimax",
+                 difficulty="Medium", timestamp=None):
+        self.board_size = board_size
+        self.moves = list(moves)
+        self.result = result
+        self.rules = rules
+        self.engine = engine
+        self.difficulty = difficulty
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+
+    def __eq__(self, other):
+        return isinstance(other, GameRecord) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return (f"GameRecord({self.board_size}x{self.board_size}, {len(self.moves)} moves, "
+                f"result={self.result!r}, {self.engine}/{self.difficulty})")
+
+    @classmethod
+    def from_game(cls, game, engine=None):
+        """Build a record from a Gomoku's stone history and state."""
+        results = {"player_win": PLAYER, "ai_win": AI, "draw": "draw"}
+        return cls(len(game.board), [(s.grid_x, s.grid_y) for s in game.stones],
+                   results.get(game.game_state), getattr(game, "rules", "standard"),
+                   engine or getattr(game, "engine", "minimax"), game.difficulty)
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated record")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_str(out, text):
+    raw = text.encode()
+    _write_varint(out, len(raw))
+    out.extend(raw)
+
+
+def _read_str(data, pos):
+    length, pos = _read_varint(data, pos)
+    return bytes(data[pos:pos + length]).decode(), pos + length
+
+
+def encode(record):
+    """Serialize a record; moves take one byte each up to 15x15, a varint beyond."""
+    body = bytearray()
+    body.append(record.board_size)
+    body.append(RULES.index(record.rules))
+    body.append(RESULTS.index(record.result))
+    _write_varint(body, record.timestamp)
+    _write_str(body, record.engine)
+    _write_str(body, record.difficulty)
+    _write_varint(body, len(record.moves))
+    one_byte = record.board_size * record.board_size <= 256
+    for x, y in record.moves:
+        if one_byte:
+            body.append(x * record.board_size + y)
+        else:
+            _write_varint(body, x * record.board_size + y)
+    out = bytearray()
+    _write_varint(out, len(body))
+    return bytes(out + body)
+
+
+def decode(data, pos=0):
+    """Parse the record starting at pos; returns (record, next_pos).
+
+    Raises ValueError if the data ends before the record does.
+    """
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise ValueError("truncated record")
+    size, rules, result = data[pos], data[pos + 1], data[pos + 2]
+    timestamp, pos = _read_varint(data, pos + 3)
+    engine, pos = _read_str(data, pos)
+    difficulty, pos = _read_str(data, pos)
+    count, pos = _read_varint(data, pos)
+    one_byte = size * size <= 256
+    moves = []
+    for _ in range(count):
+        if one_byte:
+            cell = data[pos]
+            pos += 1
+        else:
+            cell, pos = _read_varint(data, pos)
+        moves.append(divmod(cell, size))
+    return GameRecord(size, moves, RESULTS[result], RULES[rules], engine, difficulty, timestamp), end
+
+
+class RecordWriter:
+    """Append-only record file; safe to reopen and keep appending.
+
+    Reopening checks the header and cuts off a last record left partial
+    by a crash during an append, so new records start on a boundary.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(MAGIC)
+        else:
+            end = len(MAGIC)
+            try:
+                for _, end in _scan(path):
+                    pass
+            except ValueError:
+                self.file.close()
+                raise
+            if end < size:
+                self.file.truncate(end)
+        self.count = 0
+
+    def write(self, record):
+        self.file.write(encode(record))
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _scan(path):
+    """Yield (record, next_pos) for each complete record in path, stopping at a truncated tail."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            data = f.read()
+        try:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+            pos = len(MAGIC)
+            while pos < len(data):
+                try:
+                    record, pos = decode(data, pos)
+                except ValueError:
+                    # A crash during an append leaves a partial last record
+                    return
+                yield record, pos
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def read_records(path):
+    """Yield records from path without loading the whole file, skipping a truncated last record."""
+    for record, _ in _scan(path):
+        yield record
+
+
+SGF_RESULTS = {PLAYER: "B+", AI: "W+", "draw": "0"}
+
+
+def _sgf_point(x, y):
+    return chr(ord("a") + y) + chr(ord("a") + x)
+
+
+def to_sgf(record):
+    """Gomoku SGF (GM[4]); the player moves first as black."""
+    props = [f"GM[4]FF[4]SZ[{record.board_size}]RU[{record.rules}]PB[Player]PW[AI]",
+             f"GC[engine={record.engine} difficulty={record.difficulty}]",
+             f"DT[{time.strftime('%Y-%m-%d', time.gmtime(record.timestamp))}]"]
+    if record.result in SGF_RESULTS:
+        props.append(f"RE[{SGF_RESULTS[record.result]}]")
+    moves = "".join(f";{'B' if i % 2 == 0 else 'W'}[{_sgf_point(x, y)}]" for i, (x, y) in enumerate(record.moves))
+    return f"(;{''.join(props)}{moves})"
+
+
+def _sgf_properties(text):
+    i = 0
+    while i < len(text):
+        if text[i].isupper():
+            j = i
+            while j < len(text) and text[j].isupper():
+                j += 1
+            name = text[i:j]
+            i = j
+            while i < len(text) and text[i] == "[":
+                end = text.index("]", i)
+                yield name, text[i + 1:end]
+                i = end + 1
+        else:
+            i += 1
+
+
+def from_sgf(text):
+    size = 15
+    result = None
+    rules = "standard"
+    engine, difficulty = "minimax", "Medium"
+    timestamp = 0
+    moves = []
+    results = {v: k for k, v in SGF_RESULTS.items()}
+    for name, value in _sgf_properties(text):
+        if name == "SZ":
+            size = int(value)
+        elif name == "RE":
+            result = results.get(value[:2] if value[:1] in "BW" else value)
+        elif name == "RU" and value in RULES:
+            rules = value
+        elif name == "GC":
+            fields = dict(part.split("=", 1) for part in value.split() if "=" in part)
+            engine = fields.get("engine", engine)
+            difficulty = fields.get("difficulty", difficulty)
+        elif name == "DT":
+            try:
+                timestamp = calendar.timegm(time.strptime(value, "%Y-%m-%d"))
+            except ValueError:
+                pass
+        elif name in ("B", "W") and value:
+            moves.append((ord(value[1]) - ord("a"), ord(value[0]) - ord("a")))
+    return GameRecord(size, moves, result, rules, engine, difficulty, timestamp)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and convert Gomoku game records")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="summarize a record file")
+    stats.add_argument("records")
+    export = sub.add_parser("to-sgf", help="write every record as SGF, one game per line")
+    export.add_argument("records")
+    export.add_argument("output")
+    imp = sub.add_parser("from-sgf", help="append SGF games (one per line or file) to a record file")
+    imp.add_argument("records")
+    imp.add_argument("inputs", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        games = moves = 0
+        results = {}
+        for record in read_records(args.records):
+            games += 1
+            moves += len(record.moves)
+            results[record.result] = results.get(record.result, 0) + 1
+        print(f"{games} games, {moves} moves, {os.path.getsize(args.records)} bytes")
+        for result, count in results.items():
+            print(f"  {result or 'unfinished'}: {count}")
+    elif args.command == "to-sgf":
+        with open(args.output, "w") as out:
+            for record in read_records(args.records):
+                out.write(to_sgf(record) + "\n")
+    else:
+        with RecordWriter(args.records) as writer:
+            for path in args.inputs:
+                with open(path) as f:
+                    for line in f.read().split("(;")[1:]:
+                        writer.write(from_sgf("(;" + line))
+            print(f"Appended {writer.count} games to {args.records}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class RenderCache:
+    """Pre-rendered surfaces reused across frames.
+
+    Static surfaces are built once per key. Text and animation frames are
+    kept in bounded LRU maps so changing strings (the timer) and pulse
+    frames cannot grow memory without limit.
+    """
+
+    def __init__(self, max_text=256, max_frames=64):
+        self.static = {}
+        self.fonts = {}
+        self.texts = OrderedDict()
+        self.frames = OrderedDict()
+        self.max_text = max_text
+        self.max_frames = max_frames
+
+    @staticmethod
+    def _touch(store, key, limit, build):
+        surface = store.get(key)
+        if surface is None:
+            surface = build()
+            store[key] = surface
+            while len(store) > limit:
+                store.popitem(last=False)
+        else:
+            store.move_to_end(key)
+        return surface
+
+    def surface(self, key, build):
+        """Return the static surface for key, calling build() the first time."""
+        surface = self.static.get(key)
+        if surface is None:
+            surface = self.static[key] = build()
+        return surface
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            try:
+                font = pygame.font.Font(None, size)
+            except Exception:
+                font = pygame.font.SysFont(None, size)
+            self.fonts[size] = font
+        return font
+
+    def text(self, font, string, color, antialias=True):
+        return self._touch(self.texts, (font, string, tuple(color), antialias), self.max_text,
+                           lambda: font.render(string, antialias, color))
+
+    def frame(self, key, build):
+        """Return a cached animation frame; callers quantize key to a fixed number of steps."""
+        return self._touch(self.frames, key, self.max_frames, build)
+
+    def clear(self):
+        self.static.clear()
+        self.texts.clear()
+        self.frames.clear()
@@ -0,0 +1,155 @@
+import board
+
+STANDARD = "standard"     # exactly five wins, for both sides
+FREESTYLE = "freestyle"   # five or more wins
+RENJU = "renju"           # black: exactly five, no double-three, double-four or overline
+RULES = (STANDARD, FREESTYLE, RENJU)
+
+# Black moves first, and the player ('X') always moves first
+BLACK = board.CODES['X']
+# How many times a three's four-making point is itself checked for being forbidden
+RENJU_DEPTH = 2
+
+
+def exact_five(rules, code):
+    """True if only an exact five wins for code; otherwise six or more in a row win too."""
+    return rules == STANDARD or (rules == RENJU and code == BLACK)
+
+
+def _run(cells, idx, step):
+    """Black run through idx along step: (count, first cell before it, first cell after it)."""
+    fwd = idx + step
+    while cells[fwd] == BLACK:
+        fwd += step
+    back = idx - step
+    while cells[back] == BLACK:
+        back -= step
+    return (fwd - back) // step - 1, back, fwd
+
+
+def _five_points(cells, count, back, fwd, step):
+    """Empty ends of a black run of count whose filling makes exactly five."""
+    points = []
+    for end, direction in ((back, -step), (fwd, step)):
+        if cells[end] == board.EMPTY:
+            beyond = end + direction
+            while cells[beyond] == BLACK:
+                beyond += direction
+            if count + 1 + (beyond - end) // direction - 1 == 5:
+                points.append(end)
+    return points
+
+
+def _straight_four(cells, idx, step, end):
+    """True if black on the empty cell end makes an open four through idx: .XXXX."""
+    cells[end] = BLACK
+    count, back, fwd = _run(cells, idx, step)
+    straight = count == 4 and len(_five_points(cells, count, back, fwd, step)) == 2
+    cells[end] = board.EMPTY
+    return straight
+
+
+def _forbidden(grid, idx, depth):
+    """(forbidden, local) for black at the empty idx; local is False if other points were checked too."""
+    cells = grid.cells
+    cells[idx] = BLACK
+    try:
+        runs = [(step,) + _run(cells, idx, step) for step in grid.steps]
+        counts = [run[1] for run in runs]
+        # A five wins whatever else the move makes
+        if 5 in counts:
+            return False, True
+        if max(counts) > 5:
+            return True, True
+        fours = 0
+        threes = []
+        for step, count, back, fwd in runs:
+            points = _five_points(cells, count, back, fwd, step)
+            if points:
+                # .XXXX. is one four; X.XXX.X is two in the same line
+                fours += 1 if count == 4 else len(points)
+                continue
+            ends = [end for end in (back, fwd) if cells[end] == board.EMPTY and _straight_four(cells, idx, step, end)]
+            if ends:
+                threes.append(ends)
+        if fours > 1:
+            return True, True
+        if len(threes) < 2:
+            return False, True
+        if depth == 0:
+            return True, False
+        # A three only counts if black may play the point that makes it a four
+        real = sum(1 for ends in threes if any(not _forbidden(grid, end, depth - 1)[0] for end in ends))
+        return real > 1, False
+    finally:
+        cells[idx] = board.EMPTY
+
+
+def is_forbidden(grid, idx, depth=RENJU_DEPTH):
+    """True if Renju forbids black the empty cell idx of grid (a board.Board)."""
+    if grid.cells[idx] != board.EMPTY:
+        return False
+    return _forbidden(grid, idx, depth)[0]
+
+
+class ForbiddenTracker:
+    """is_forbidden for one board, remembered until a stone nearby changes.
+
+    Without recursion the answer for a cell depends only on the cells up to
+    five away along its four lines, so a change only forgets the answers on
+    those lines. Answers that needed recursion are never kept. Call changed()
+    after every stone placed or removed.
+    """
+
+    def __init__(self, grid, depth=RENJU_DEPTH):
+        self.grid = grid
+        self.depth = depth
+        self.known = {}
+        self.reach = reach_table(grid.size)
+        self.hits = 0
+        self.misses = 0
+
+    def changed(self, idx):
+        known = self.known
+        if known:
+            for cell in self.reach[idx]:
+                known.pop(cell, None)
+
+    def clear(self):
+        self.known.clear()
+
+    def is_forbidden(self, idx):
+        result = self.known.get(idx)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        if self.grid.cells[idx] != board.EMPTY:
+            return False
+        result, local = _forbidden(self.grid, idx, self.depth)
+        if local:
+            self.known[idx] = result
+        return result
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.known), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_reach_tables = {}
+
+
+def reach_table(size):
+    """For each Board index, the playable cells up to five away along its four lines."""
+    table = _reach_tables.get(size)
+    if table is None:
+        grid = board.Board(size)
+        table = [()] * len(grid.cells)
+        for idx in grid.playable:
+            x, y = grid.coords(idx)
+            table[idx] = tuple(grid.index(x + k * dx, y + k * dy)
+                               for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)) for k in range(-5, 6)
+                               if 0 <= x + k * dx < size and 0 <= y + k * dy < size)
+        _reach_tables[size] = table
+    return table
@@ -0,0 +1,180 @@
+import hashlib
+import mmap
+import os
+import random
+import struct
+from collections import OrderedDict
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+MAGIC = b"GMKC"
+VERSION = 2                            # 2: keys are salted with the rule variant
+HEADER = struct.Struct("<4sHHI")       # magic, version, board size, record count
+RECORD = struct.Struct("<QiBBxx")      # key, score, depth, flag
+# Scores are stored as int32; infinite ones (no legal move) are clamped to these bounds
+SCORE_LIMIT = 2 ** 31 - 1
+# Rough in-memory cost of one OrderedDict entry holding a key and a small tuple
+ENTRY_BYTES = 160
+
+
+def zobrist_table(size, players):
+    """Per-cell random keys, seeded by board size so they are stable across runs."""
+    rng = random.Random(0x9E3779B97F4A7C15 ^ size)
+    return {p: [[rng.getrandbits(64) for _ in range(size)] for _ in range(size)] for p in players}
+
+
+def _packed_score(score):
+    """score as a RECORD int32: rounded and clamped, or None for NaN."""
+    if score != score:
+        return None
+    return int(round(max(-SCORE_LIMIT, min(SCORE_LIMIT, score))))
+
+
+def salt(name):
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+class SearchCache:
+    """Transposition table that survives between searches and, optionally, sessions.
+
+    Recent entries live in an LRU dict bounded by max_bytes. A saved file is
+    a sorted array of fixed-size records that is memory-mapped on load and
+    binary-searched on a miss, so a large warm cache costs no startup time.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, board_size=None):
+        self.max_bytes = max_bytes
+        self.board_size = board_size
+        self.entries = OrderedDict()
+        self.disk = None
+        self.disk_count = 0
+        self.disk_file = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def memory_bytes(self):
+        return len(self.entries) * ENTRY_BYTES
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        entry = self._disk_get(key)
+        if entry is not None:
+            self.disk_hits += 1
+            self._insert(key, entry)
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, depth, score, flag):
+        old = self.entries.get(key)
+        if old is not None and old[0] > depth:
+            return
+        self._insert(key, (depth, score, flag))
+
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        limit = max(1, self.max_bytes // ENTRY_BYTES)
+        while len(self.entries) > limit:
+            self.entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        lo, hi = 0, self.disk_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k, score, depth, flag = RECORD.unpack_from(self.disk, HEADER.size + mid * RECORD.size)
+            if k == key:
+                return (depth, score, flag)
+            if k < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def load(self, path):
+        """Map a saved cache; returns the number of records available."""
+        self.close()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return 0
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            data = f.read()
+            f.close()
+            f = None
+        if len(data) < HEADER.size:
+            return 0
+        magic, version, size, count = HEADER.unpack_from(data, 0)
+        if (magic != MAGIC or version != VERSION or (self.board_size and size != self.board_size)
+                or len(data) < HEADER.size + count * RECORD.size):
+            if f:
+                data.close()
+                f.close()
+            return 0
+        self.disk, self.disk_file, self.disk_count = data, f, count
+        return count
+
+    def save(self, path):
+        """Write memory and mapped entries, best first, within the byte budget."""
+        records = {}
+        for i in range(self.disk_count):
+            k, score, depth, flag = RECORD.unpack_from(self.disk, HEADER.size + i * RECORD.size)
+            records[k] = (depth, score, flag)
+        # Deeper disk entries first, then the in-memory ones (most recent last) on top
+        ranked = sorted(records.items(), key=lambda kv: kv[1][0])
+        ranked.extend(self.entries.items())
+        keep = {}
+        for k, entry in ranked:
+            keep.pop(k, None)
+            keep[k] = entry
+        limit = max(0, (self.max_bytes - HEADER.size) // RECORD.size)
+        kept = []
+        for k, (depth, score, flag) in keep.items():
+            score = _packed_score(score)
+            if score is not None:
+                kept.append((k, (depth, score, flag)))
+        kept = kept[-limit:] if limit else []
+        kept.sort()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.board_size or 0, len(kept)))
+            f.write(b"".join(RECORD.pack(k, score, depth, flag) for k, (depth, score, flag) in kept))
+        self.close()
+        os.replace(tmp, path)
+        return len(kept)
+
+    def close(self):
+        if self.disk_file is not None:
+            self.disk.close()
+            self.disk_file.close()
+        self.disk = None
+        self.disk_file = None
+        self.disk_count = 0
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "memory_bytes": self.memory_bytes(),
+            "disk_records": self.disk_count,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
@@ -0,0 +1,236 @@
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# Board markers, kept in sync with gomoku7.py / gomoku8.py
+BOARD_SIZE = 10
+EMPTY = '.'
+PLAYER = 'X'
+AI = 'O'
+
+INDEX_FILE = "index.json"
+SIDES = {PLAYER: 0, AI: 1}
+
+
+def sample_dtype(size):
+    """One training sample per engine move.
+
+    planes: stones of the player (0) and the AI (1) before the move;
+    side: who moves, 0 player, 1 AI; score: the engine's score for the
+    move, from the mover's point of view; move: x * size + y;
+    outcome: 1 if the mover went on to win, -1 if they lost, 0 for a draw.
+    """
+    return np.dtype([("planes", np.uint8, (2, size, size)), ("side", np.int8), ("score", np.float32),
+                     ("move", np.int16), ("outcome", np.int8)])
+
+
+_game = None
+
+
+def _init_worker(difficulty, cache_bytes):
+    global _game
+    import headless
+    import search_cache
+    _game = headless.new_game(difficulty=difficulty, cache=search_cache.SearchCache(cache_bytes, BOARD_SIZE))
+
+
+def play_game(seed, random_plies=2):
+    """Play one engine-vs-engine game from a seeded random opening; returns its samples.
+
+    The seed fixes the opening and every random choice the engine makes,
+    and the search cache starts empty, so a game depends only on its seed
+    as long as searches stop on their node budget rather than their time
+    limit.
+    """
+    import headless
+
+    random.seed(seed)
+    opening = random.Random(seed)
+    game = headless.load_position(_game, [])
+    game.cache.clear()
+    rows = []
+    side = PLAYER
+    winner = None
+    while not game.is_full():
+        if len(game.stones) < random_plies:
+            move = opening.choice(game.get_smart_moves())
+        else:
+            planes = np.array([[[cell == marker for cell in row] for row in game.board] for marker in (PLAYER, AI)],
+                              dtype=np.uint8)
+            move = game.get_best_move(side)
+            if move is None:
+                break
+            rows.append((planes, SIDES[side], game.search_stats["score"], move[0] * BOARD_SIZE + move[1]))
+        game.make_move(move[0], move[1], side, animate=False)
+        if game.is_winner(side):
+            winner = side
+            break
+        side = AI if side == PLAYER else PLAYER
+    samples = np.zeros(len(rows), dtype=sample_dtype(BOARD_SIZE))
+    for i, (planes, mover, score, move) in enumerate(rows):
+        samples[i] = (planes, mover, score, move, 0 if winner is None else (1 if SIDES[winner] == mover else -1))
+    return samples
+
+
+class ShardWriter:
+    """Appends samples to preallocated, memory-mapped .npy shards under directory.
+
+    Each shard holds shard_size samples; index.json lists the shards and how
+    many rows of each are filled, and is rewritten after every append so a
+    reader never sees a half-written game. Opening an existing directory
+    continues where it left off.
+    """
+
+    def __init__(self, directory, shard_size=65536, board_size=BOARD_SIZE):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.dtype = sample_dtype(board_size)
+        path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f)
+            if self.index["board_size"] != board_size:
+                raise ValueError(f"{directory} holds {self.index['board_size']}x{self.index['board_size']} samples")
+        else:
+            self.index = {"board_size": board_size, "shard_size": shard_size, "games": 0, "samples": 0, "shards": []}
+        self.shard = None
+        if self.index["shards"] and self.index["shards"][-1]["rows"] < self.index["shard_size"]:
+            last = self.index["shards"][-1]
+            self.shard = np.load(os.path.join(directory, last["file"]), mmap_mode="r+")
+
+    def _next_shard(self):
+        if self.shard is not None:
+            self.shard.flush()
+        name = f"shard-{len(self.index['shards']):05d}.npy"
+        self.shard = np.lib.format.open_memmap(os.path.join(self.directory, name), mode="w+", dtype=self.dtype,
+                                               shape=(self.index["shard_size"],))
+        self.index["shards"].append({"file": name, "rows": 0})
+
+    def append(self, samples):
+        """Write one game's samples, splitting them across shards as needed."""
+        start = 0
+        while start < len(samples):
+            if self.shard is None or self.index["shards"][-1]["rows"] == self.index["shard_size"]:
+                self._next_shard()
+            entry = self.index["shards"][-1]
+            count = min(len(samples) - start, self.index["shard_size"] - entry["rows"])
+            self.shard[entry["rows"]:entry["rows"] + count] = samples[start:start + count]
+            entry["rows"] += count
+            start += count
+        self.index["games"] += 1
+        self.index["samples"] += len(samples)
+        self._save_index()
+
+    def _save_index(self):
+        if self.shard is not None:
+            self.shard.flush()
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        if self.shard is not None:
+            self.shard.flush()
+            self.shard = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Dataset:
+    """Read-only, zero-copy view of a directory written by ShardWriter.
+
+    dataset[i] and dataset.shards() return views into the memory-mapped
+    shards; nothing is read until the fields are used.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.arrays = [np.load(os.path.join(directory, shard["file"]), mmap_mode="r")[:shard["rows"]]
+                       for shard in self.index["shards"]]
+        self.offsets = np.cumsum([0] + [len(a) for a in self.arrays])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        shard = int(np.searchsorted(self.offsets, i, side="right")) - 1
+        return self.arrays[shard][i - self.offsets[shard]]
+
+    def shards(self):
+        return list(self.arrays)
+
+
+def generate(directory, games, difficulty="Medium", workers=None, seed=0, random_plies=2,
+             shard_size=65536, cache_bytes=16 * 1024 * 1024, log=sys.stderr):
+    """Play games across a process pool and append their samples to directory.
+
+    Game i uses seed + i, whichever worker plays it, and games are written
+    in order, so a run with the same arguments writes the same dataset.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.time()
+    with ShardWriter(directory, shard_size) as writer, \
+            ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(difficulty, cache_bytes)) as pool:
+        first = writer.index["games"]
+        seeds = iter(range(seed + first, seed + first + games))
+        pending = {}
+        finished = {}
+        written = 0
+        while True:
+            # A couple of games per worker in flight keeps cores busy
+            for game_seed in seeds:
+                pending[pool.submit(play_game, game_seed, random_plies)] = game_seed
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[pending.pop(future)] = future.result()
+            while seed + first + written in finished:
+                writer.append(finished.pop(seed + first + written))
+                written += 1
+            if log is not None:
+                elapsed = time.time() - start
+                print(f"\r{written}/{games} games, {writer.index['samples']} samples, "
+                      f"{written / elapsed if elapsed else 0:.2f} games/s", end="", file=log)
+    if log is not None:
+        print(file=log)
+    return writer.index
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write engine-vs-engine training samples as memory-mapped .npy shards")
+    parser.add_argument("directory", help="output directory; an existing one is appended to")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--difficulty", default="Medium")
+    parser.add_argument("--seed", type=int, default=0, help="game i of the directory is played with seed + i")
+    parser.add_argument("--random-plies", type=int, default=2, help="random opening moves before the engine plays")
+    parser.add_argument("--shard-size", type=int, default=65536, help="samples per shard")
+    args = parser.parse_args(argv)
+    index = generate(args.directory, args.games, args.difficulty, args.workers, args.seed, args.random_plies,
+                     args.shard_size)
+    print(f"{index['games']} games, {index['samples']} samples in {len(index['shards'])} shards")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import mcts
+
+# Board and markers, kept in sync with gomoku7.py / gomoku8.py
+BOARD_SIZE = 10
+EMPTY = '.'
+PLAYER = 'X'
+AI = 'O'
+
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+ENGINES = ["minimax", "mcts"]
+
+_game = None
+
+
+def _init_worker():
+    global _game
+    import headless
+    _game = headless.new_game()
+
+
+def engine_move(moves, difficulty, engine):
+    """Best move for the AI after moves (player first), computed in a pool worker."""
+    import headless
+    import mcts as mcts_module
+
+    game = headless.load_position(_game, moves)
+    game.difficulty = difficulty
+    game.engine = engine
+    if engine == "mcts" and game.mcts_engine is None:
+        # Workers already fill the cores; a nested pool would only oversubscribe
+        game.mcts_engine = mcts_module.MCTSEngine(workers=1)
+    return game.get_best_move()
+
+
+class Session:
+    """One game: the board, its connected players and whose turn it is."""
+
+    def __init__(self, game_id, mode, difficulty, engine):
+        self.id = game_id
+        self.mode = mode
+        self.difficulty = difficulty
+        self.engine = engine
+        self.board = [EMPTY] * (BOARD_SIZE * BOARD_SIZE)
+        self.moves = []
+        self.players = {}
+        self.state = "playing" if mode == "ai" else "waiting"
+        self.thinking = False
+
+    @property
+    def turn(self):
+        return PLAYER if len(self.moves) % 2 == 0 else AI
+
+    def play(self, x, y, side):
+        idx = x * BOARD_SIZE + y
+        self.board[idx] = side
+        self.moves.append((x, y))
+        if mcts.is_five(self.board, BOARD_SIZE, idx, side):
+            self.state = "player_win" if side == PLAYER else "ai_win"
+        elif len(self.moves) == len(self.board):
+            self.state = "draw"
+
+    def public(self):
+        return {"game": self.id, "mode": self.mode, "difficulty": self.difficulty, "engine": self.engine,
+                "state": self.state, "moves": [list(m) for m in self.moves]}
+
+
+class EngineDispatcher:
+    """Feeds AI turns to a process pool.
+
+    Each session has at most one request outstanding (it is waiting for the
+    AI), and requests are served first come, first served, so one busy
+    client cannot starve the others. The queue is bounded: when it is full,
+    submitting blocks, which stops the server reading from that connection
+    and pushes back on the client through TCP.
+    """
+
+    def __init__(self, workers=None, max_pending=1024):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(max_pending)
+        self.pool = None
+        self.tasks = []
+        self.latencies = deque(maxlen=10000)
+        self.completed = 0
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        self.tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, session, callback):
+        """Queue the AI's turn; callback(session, move) gets the result, or (session, None, error)."""
+        session.thinking = True
+        await self.queue.put((time.perf_counter(), session, callback))
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            queued, session, callback = await self.queue.get()
+            try:
+                if session.state != "playing":
+                    continue
+                try:
+                    move = await loop.run_in_executor(self.pool, engine_move, list(session.moves),
+                                                      session.difficulty, session.engine)
+                except Exception as exc:
+                    session.thinking = False
+                    print(f"Engine error in game {session.id}: {exc!r}", file=sys.stderr)
+                    await callback(session, None, exc)
+                    continue
+                self.latencies.append(time.perf_counter() - queued)
+                self.completed += 1
+                session.thinking = False
+                await callback(session, move)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Error finishing AI turn in game {session.id}: {exc!r}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0
+        return {"ai_moves": self.completed, "queued": self.queue.qsize(), "workers": self.workers,
+                "p99_ms": round(p99 * 1000, 2)}
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class GameServer:
+    """JSON-lines game server over TCP.
+
+    Requests are objects with an "op": new (mode "ai" or "pvp", difficulty,
+    engine), join (game), move (game, x, y), resign (game; players of a game
+    in progress only), state (game) and stats. Replies and pushed updates
+    carry an "event" field; a game whose engine fails ends as "aborted".
+    """
+
+    def __init__(self, dispatcher, max_sessions=10000):
+        self.dispatcher = dispatcher
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    reply = await self.dispatch(request, writer, owned)
+                except (ValueError, KeyError, TypeError) as exc:
+                    reply = {"event": "error", "message": str(exc)}
+                if reply is not None:
+                    await self.send(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            for game_id in owned:
+                session = self.sessions.pop(game_id, None)
+                if session is not None and session.state in ("playing", "waiting"):
+                    session.state = "abandoned"
+                    await self.broadcast(session, {"event": "state", **session.public()})
+            writer.close()
+
+    async def send(self, writer, message):
+        if writer.is_closing():
+            return
+        writer.write((json.dumps(message) + "\n").encode())
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def broadcast(self, session, message):
+        for writer in set(session.players.values()):
+            await self.send(writer, message)
+
+    def session(self, request):
+        session = self.sessions.get(request["game"])
+        if session is None:
+            raise KeyError(f"no game {request['game']}")
+        return session
+
+    async def dispatch(self, request, writer, owned):
+        op = request["op"]
+        if op == "new":
+            if len(self.sessions) >= self.max_sessions:
+                return {"event": "error", "message": "server full"}
+            mode = request.get("mode", "ai")
+            difficulty = request.get("difficulty", "Medium")
+            engine = request.get("engine", "minimax")
+            if mode not in ("ai", "pvp") or difficulty not in DIFFICULTIES or engine not in ENGINES:
+                raise ValueError("bad mode, difficulty or engine")
+            session = Session(next(self.ids), mode, difficulty, engine)
+            session.players[PLAYER] = writer
+            self.sessions[session.id] = session
+            owned.add(session.id)
+            return {"event": "created", "side": PLAYER, **session.public()}
+        if op == "join":
+            session = self.session(request)
+            if session.state != "waiting":
+                raise ValueError("game is not open")
+            session.players[AI] = writer
+            session.state = "playing"
+            owned.add(session.id)
+            await self.broadcast(session, {"event": "state", **session.public()})
+            return {"event": "joined", "side": AI, "game": session.id}
+        if op == "move":
+            session = self.session(request)
+            x, y = int(request["x"]), int(request["y"])
+            side = session.turn
+            if session.state != "playing" or session.thinking or session.players.get(side) is not writer:
+                raise ValueError("not your turn")
+            if not (0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE) or session.board[x * BOARD_SIZE + y] != EMPTY:
+                raise ValueError("illegal move")
+            session.play(x, y, side)
+            await self.broadcast(session, {"event": "move", "game": session.id, "x": x, "y": y,
+                                           "side": side, "state": session.state})
+            if session.mode == "ai" and session.state == "playing":
+                await self.dispatcher.submit(session, self.ai_played)
+            return None
+        if op == "resign":
+            session = self.session(request)
+            if writer not in session.players.values():
+                raise ValueError("not a player in this game")
+            if session.state != "playing":
+                raise ValueError("game is not in progress")
+            session.state = "ai_win" if session.players.get(PLAYER) is writer else "player_win"
+            await self.broadcast(session, {"event": "state", **session.public()})
+            return None
+        if op == "state":
+            return {"event": "state", **self.session(request).public()}
+        if op == "stats":
+            return {"event": "stats", "sessions": len(self.sessions), "connections": self.connections,
+                    **self.dispatcher.stats()}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def ai_played(self, session, move, error=None):
+        if session.state != "playing":
+            return
+        if error is not None:
+            # The AI cannot move, so the game cannot go on
+            session.state = "aborted"
+            await self.broadcast(session, {"event": "error", "game": session.id, "message": f"engine failed: {error}"})
+            await self.broadcast(session, {"event": "state", **session.public()})
+            return
+        if move is None:
+            return
+        x, y = move
+        session.play(x, y, AI)
+        await self.broadcast(session, {"event": "move", "game": session.id, "x": x, "y": y,
+                                       "side": AI, "state": session.state})
+
+
+async def serve(host="127.0.0.1", port=8765, workers=None, max_sessions=10000, ready=None):
+    dispatcher = EngineDispatcher(workers)
+    dispatcher.start()
+    game_server = GameServer(dispatcher, max_sessions)
+    server = await asyncio.start_server(game_server.handle, host, port, limit=1 << 16)
+    print(f"Serving on {host}:{port} with {dispatcher.workers} engine workers")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await dispatcher.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Host many Gomoku games over TCP (JSON lines)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="engine processes (default: all cores)")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_sessions))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+import random
+import sys
+import time
+
+import board
+import rules
+
+# Board markers, kept in sync with gomoku7.py / gomoku8.py
+EMPTY = '.'
+PLAYER = 'X'
+AI = 'O'
+
+INF = 10 ** 9
+
+
+class SolveResult:
+    def __init__(self, status, attacker, move=None, pv=None, line=None, nodes=0, elapsed=0.0):
+        self.status = status          # "proven", "disproven" or "unknown"
+        self.attacker = attacker
+        self.move = move              # first winning move when proven
+        self.pv = pv or []            # [(x, y, player), ...] ending in five
+        self.line = line              # (start_x, start_y, end_x, end_y) of the five
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def summary(self):
+        if self.status == "proven":
+            return f"Forced win for {self.attacker} at {self.move} in {len(self.pv)} plies"
+        if self.status == "disproven":
+            return f"No forced win by threats for {self.attacker}"
+        return f"Unknown after {self.nodes} nodes ({self.elapsed:.1f}s)"
+
+    def __repr__(self):
+        return f"SolveResult({self.summary()!r}, nodes={self.nodes})"
+
+
+class _Abort(Exception):
+    pass
+
+
+class ProofNumberSolver:
+    """Depth-first proof-number (df-pn) search for a forced five in threat space.
+
+    The attacker only plays threats: moves that make a four or a three
+    that can become an open four. The defender answers a four by blocking
+    it and a three with every move that stops all of the attacker's open
+    fours, and may always counter with a four of their own; with no threat
+    on the board it may play anywhere. A proof is therefore a real forced
+    win, and a disproof means no win by continuous threats exists. Fives
+    follow game.rules, and under Renju black never plays a forbidden point.
+    """
+
+    def __init__(self, game, time_limit=5.0, node_limit=200000, max_entries=500000):
+        self.game = game
+        self.size = len(game.board)
+        self.rules = getattr(game, "rules", rules.STANDARD)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_entries = max_entries
+        self.table = {}
+        self.nodes = 0
+        self.reach = rules.reach_table(self.size)
+        rng = random.Random(0x5eed)
+        self.zobrist = {
+            p: [[rng.getrandbits(64) for _ in range(self.size)] for _ in range(self.size)]
+            for p in (PLAYER, AI)
+        }
+
+    def solve(self, attacker=None):
+        rows = self.game.board
+        # Search on a private copy so the game's board is never touched
+        self.grid = board.Board.from_rows(rows)
+        if attacker is None:
+            stones = sum(cell != EMPTY for row in rows for cell in row)
+            attacker = PLAYER if stones % 2 == 0 else AI
+        self.attacker = attacker
+        self.nodes = 0
+        self.start = time.time()
+        key = 0
+        for x in range(self.size):
+            for y in range(self.size):
+                if rows[x][y] != EMPTY:
+                    key ^= self.zobrist[rows[x][y]][x][y]
+        status = "unknown"
+        try:
+            self._mid(key, attacker, INF - 1, INF - 1)
+            phi, delta = self._lookup(key)[:2]
+            if phi == 0:
+                status = "proven"
+            elif delta == 0:
+                status = "disproven"
+        except _Abort:
+            pass
+        result = SolveResult(status, attacker, nodes=self.nodes, elapsed=time.time() - self.start)
+        if status == "proven":
+            result.pv, result.line = self._principal_variation(key, attacker)
+            if result.pv:
+                result.move = result.pv[0][:2]
+        return result
+
+    def _lookup(self, key):
+        return self.table.get(key, (1, 1, 0))
+
+    def _store(self, key, phi, delta, work):
+        if len(self.table) >= self.max_entries:
+            self._evict()
+        self.table[key] = (phi, delta, work)
+
+    def _evict(self):
+        # Keep solved entries and the half of the table that took most work to build
+        entries = sorted(self.table.items(), key=lambda kv: (kv[1][0] == 0 or kv[1][1] == 0, kv[1][2]))
+        for k, _ in entries[:len(entries) // 2]:
+            del self.table[k]
+
+    def _playable(self, idx, code):
+        return not (self.rules == rules.RENJU and code == rules.BLACK and rules.is_forbidden(self.grid, idx))
+
+    def _five_at(self, x, y, player):
+        code = board.CODES[player]
+        found = self.grid.five_at(self.grid.index(x, y), code, rules.exact_five(self.rules, code))
+        return found and self.grid.coords(found[0]) + self.grid.coords(found[1])
+
+    def _completes_five(self, x, y, player):
+        grid = self.grid
+        idx = grid.index(x, y)
+        grid.cells[idx] = board.CODES[player]
+        line = self._five_at(x, y, player)
+        grid.cells[idx] = board.EMPTY
+        return line
+
+    def _makes_five(self, idx, code):
+        cells = self.grid.cells
+        cells[idx] = code
+        found = self.grid.five_at(idx, code, rules.exact_five(self.rules, code))
+        cells[idx] = board.EMPTY
+        return found is not None
+
+    def _open_four(self, idx, code):
+        """True if code on the empty idx makes a four with five points at both ends, and may play there."""
+        grid = self.grid
+        cells = grid.cells
+        cells[idx] = code
+        try:
+            found = any(count == 4 and all(cells[end] == board.EMPTY and self._makes_five(end, code)
+                                           for end in (first - step, last + step))
+                        for step in grid.steps for count, _, first, last in (grid.line(idx, code, step),))
+        finally:
+            cells[idx] = board.EMPTY
+        # The forbidden-point check is the costly part, so it comes last
+        return found and self._playable(idx, code)
+
+    def _is_threat(self, idx, code):
+        """True if code on the empty idx makes a four, or a three that can become an open four."""
+        grid = self.grid
+        cells = grid.cells
+        cells[idx] = code
+        try:
+            for step in grid.steps:
+                for k in (-4, -3, -2, -1, 1, 2, 3, 4):
+                    cell = idx + k * step
+                    if cells[cell] == board.EMPTY and (self._makes_five(cell, code) or self._open_four(cell, code)):
+                        return True
+            return False
+        finally:
+            cells[idx] = board.EMPTY
+
+    def _defences(self, local, side):
+        """Moves for the defender side against the attacker's threes, plus the defender's own fours."""
+        grid = self.grid
+        cells = grid.cells
+        code = board.CODES[side]
+        threat = board.CODES[self.attacker]
+        local = [grid.index(x, y) for x, y in local]
+        # Open fours can only be made next to a stone of their own colour
+        points = [idx for idx in local if self._open_four(idx, threat)]
+        if not points:
+            return [grid.coords(idx) for idx in grid.empties()]
+        defences = set()
+        for idx in local:
+            cells[idx] = code
+            if any(cells[cell] == board.EMPTY and self._makes_five(cell, code) for cell in self.reach[idx]):
+                defences.add(idx)
+            cells[idx] = board.EMPTY
+        candidates = {cell for point in points for cell in self.reach[point] if cells[cell] == board.EMPTY}
+        for idx in candidates - defences:
+            cells[idx] = code
+            if not any(cells[point] == board.EMPTY and self._open_four(point, threat) for point in points):
+                defences.add(idx)
+            cells[idx] = board.EMPTY
+        return sorted(grid.coords(idx) for idx in defences)
+
+    def _neighbours(self):
+        grid = self.grid
+        moves = grid.empty_neighbours()
+        center = grid.index(self.size // 2, self.size // 2)
+        if not moves and grid.cells[center] == board.EMPTY:
+            moves.add(center)
+        return sorted(grid.coords(idx) for idx in moves)
+
+    def _children(self, side):
+        """Return (moves, terminal) where terminal is (phi, delta) or None."""
+        moves, terminal = self._candidates(side)
+        if terminal is None and self.rules == rules.RENJU and board.CODES[side] == rules.BLACK:
+            grid = self.grid
+            moves = [(x, y) for x, y in moves if self._playable(grid.index(x, y), rules.BLACK)]
+        return moves, terminal
+
+    def _candidates(self, side):
+        opponent = AI if side == PLAYER else PLAYER
+        local = self._neighbours()
+        if not local:
+            # Full board: a draw is a win for the defender
+            return [], (0, INF) if side != self.attacker else (INF, 0)
+        for x, y in local:
+            if self._completes_five(x, y, side):
+                return [(x, y)], (0, INF)
+        blocks = [(x, y) for x, y in local if self._completes_five(x, y, opponent)]
+        if blocks:
+            return blocks, None
+        if side == self.attacker:
+            code = board.CODES[side]
+            return [(x, y) for x, y in local if self._is_threat(self.grid.index(x, y), code)], None
+        return self._defences(local, side), None
+
+    def _check_limits(self):
+        self.nodes += 1
+        if self.node_limit and self.nodes > self.node_limit:
+            raise _Abort()
+        if self.time_limit and self.nodes % 256 == 0 and time.time() - self.start > self.time_limit:
+            raise _Abort()
+
+    def _mid(self, key, side, th_phi, th_delta):
+        phi, delta, work = self._lookup(key)
+        if phi >= th_phi or delta >= th_delta:
+            return
+        self._check_limits()
+        start_nodes = self.nodes
+        moves, terminal = self._children(side)
+        if terminal:
+            self._store(key, terminal[0], terminal[1], 1)
+            return
+        opponent = AI if side == PLAYER else PLAYER
+        grid = self.grid
+        child_keys = [key ^ self.zobrist[side][x][y] for x, y in moves]
+        while True:
+            phi = INF
+            delta = 0
+            best = None
+            best_delta = second_delta = INF
+            best_phi = 0
+            for i, ck in enumerate(child_keys):
+                c_phi, c_delta = self._lookup(ck)[:2]
+                phi = min(phi, c_delta)
+                delta = min(INF, delta + c_phi)
+                if c_delta < best_delta:
+                    second_delta = best_delta
+                    best, best_delta, best_phi = i, c_delta, c_phi
+                elif c_delta < second_delta:
+                    second_delta = c_delta
+            if phi >= th_phi or delta >= th_delta:
+                self._store(key, phi, delta, work + self.nodes - start_nodes)
+                return
+            child_th_phi = min(INF - 1, th_delta + best_phi - delta)
+            child_th_delta = min(th_phi, second_delta + 1)
+            x, y = moves[best]
+            grid.set(x, y, side)
+            try:
+                self._mid(child_keys[best], opponent, child_th_phi, child_th_delta)
+            finally:
+                grid.set(x, y, EMPTY)
+
+    def _prove_child(self, key, move, side):
+        x, y = move
+        self.grid.set(x, y, side)
+        try:
+            self._mid(key, AI if side == PLAYER else PLAYER, INF - 1, INF - 1)
+        except _Abort:
+            pass
+        finally:
+            self.grid.set(x, y, EMPTY)
+
+    def _principal_variation(self, key, side):
+        grid = self.grid
+        pv = []
+        line = None
+        try:
+            while True:
+                moves, terminal = self._children(side)
+                if terminal:
+                    if terminal[0] == 0 and moves:
+                        x, y = moves[0]
+                        line = self._completes_five(x, y, side)
+                        pv.append((x, y, side))
+                    break
+                if not moves:
+                    if side == self.attacker:
+                        break
+                    # No defence: every move loses, so block anywhere and let the attacker finish
+                    code = board.CODES[side]
+                    moves = [(x, y) for x, y in self._neighbours() if self._playable(grid.index(x, y), code)][:1]
+                    if not moves:
+                        break
+                keys = [key ^ self.zobrist[side][x][y] for x, y in moves]
+                if side == self.attacker:
+                    # An open four wins in two more plies, so prove one before following a longer line
+                    code = board.CODES[side]
+                    fours = [i for i, (x, y) in enumerate(moves) if self._open_four(grid.index(x, y), code)]
+                    if fours and self._lookup(keys[fours[0]])[1] != 0:
+                        self._prove_child(keys[fours[0]], moves[fours[0]], side)
+                    # Pick a child the defender has been disproven in
+                    choices = [i for i, k in enumerate(keys) if self._lookup(k)[1] == 0]
+                    if not choices:
+                        # Not searched yet, e.g. after a lost defender's arbitrary move
+                        try:
+                            self._mid(key, side, INF - 1, INF - 1)
+                        except _Abort:
+                            break
+                        choices = [i for i, k in enumerate(keys) if self._lookup(k)[1] == 0]
+                    if not choices:
+                        break
+                    i = min(choices, key=lambda c: (c not in fours, self._lookup(keys[c])[2]))
+                else:
+                    # Longest resistance: the refutation that took most work
+                    i = max(range(len(keys)), key=lambda c: self._lookup(keys[c])[2])
+                x, y = moves[i]
+                grid.set(x, y, side)
+                pv.append((x, y, side))
+                key = keys[i]
+                side = AI if side == PLAYER else PLAYER
+        finally:
+            for x, y, _ in pv:
+                grid.set(x, y, EMPTY)
+        return pv, line
+
+
+def solve(game, attacker=None, time_limit=5.0, node_limit=200000, max_entries=500000):
+    """Solve the current position of game for attacker (default: side to move)."""
+    return ProofNumberSolver(game, time_limit, node_limit, max_entries).solve(attacker)
+
+
+def main(argv=None):
+    import argparse
+    from headless import new_game, parse_moves
+
+    parser = argparse.ArgumentParser(description="Prove or disprove a forced win with df-pn search")
+    parser.add_argument("moves", nargs="?", default="", help='moves as "x,y x,y ...", player first')
+    parser.add_argument("--attacker", choices=[PLAYER, AI], help="side to prove a win for (default: side to move)")
+    parser.add_argument("--time", type=float, default=10.0, help="time limit in seconds")
+    parser.add_argument("--nodes", type=int, default=1000000, help="node expansion limit")
+    parser.add_argument("--memory", type=int, default=500000, help="max stored table entries")
+    args = parser.parse_args(argv)
+
+    game = new_game(parse_moves(args.moves))
+    result = solve(game, args.attacker, args.time, args.nodes, args.memory)
+    print(result.summary())
+    if result.pv:
+        print("Line:", " ".join(f"{p}{x},{y}" for x, y, p in result.pv))
+        print("Five:", result.line)
+    print(f"{result.nodes} nodes in {result.elapsed:.2f}s")
+    return 0 if result.status != "unknown" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import annotate
+import board
+
+# Board markers, kept in sync with gomoku7.py / gomoku8.py
+EMPTY = '.'
+PLAYER = 'X'
+AI = 'O'
+
+# Window shapes scored by evaluate_hard: a window of five holding only one
+# colour, with the stones counted and "open" ends. A four is open if either
+# end of the window is empty, a three or two if both are.
+SHAPES = ["four_open", "four", "three_open", "three", "two_open", "two"]
+FEATURES = [f"{side}_{shape}" for side in ("ai", "player") for shape in SHAPES] + ["center"]
+# evaluate_hard's hand-picked weights; "center" scales its centre bonus for AI stones
+HARD_WEIGHTS = {
+    "ai_four_open": 1000, "ai_four": 500, "ai_three_open": 200, "ai_three": 50, "ai_two_open": 10, "ai_two": 5,
+    "player_four_open": -1000, "player_four": -1000, "player_three_open": -200, "player_three": -50,
+    "player_two_open": -10, "player_two": -5, "center": 1,
+}
+# Fives end the game before anything is evaluated, so they keep evaluate_hard's scores
+FIVE_SCORES = {AI: 10000, PLAYER: 0}
+NAMES = {4: "four", 3: "three", 2: "two"}
+
+
+def window_feature(pattern):
+    """Feature of a window of five markers, "five" for five in a row, or None if it scores nothing."""
+    for side, name in ((AI, "ai"), (PLAYER, "player")):
+        stones = pattern.count(side)
+        if stones < 2 or stones + pattern.count(EMPTY) != 5:
+            continue
+        if stones == 5:
+            return "five"
+        ends = (pattern[0] == EMPTY) + (pattern[4] == EMPTY)
+        opened = ends > 0 if stones == 4 else ends == 2
+        return f"{name}_{NAMES[stones]}{'_open' if opened else ''}"
+    return None
+
+
+def _patterns():
+    return [[board.MARKERS[key // 3 ** k % 3] for k in range(5)] for key in range(3 ** 5)]
+
+
+def pattern_scores(weights):
+    """Score of every window key (board.WindowTable) under weights, as gomoku8.PATTERN_SCORES holds them."""
+    table = []
+    for pattern in _patterns():
+        feature = window_feature(pattern)
+        if feature == "five":
+            table.append(FIVE_SCORES[pattern[0]])
+        else:
+            table.append(round(weights.get(feature, 0)) if feature else 0)
+    return table
+
+
+# Feature column of every window key; fives and empty windows go to a spare column
+WINDOW_COLUMNS = np.array([FEATURES.index(f) if f not in (None, "five") else len(FEATURES)
+                           for f in map(window_feature, _patterns())], dtype=np.intp)
+
+_layouts = {}
+
+
+def _layout(size):
+    """Flat cell indices of every window, and the centre bonus of every cell, for size."""
+    layout = _layouts.get(size)
+    if layout is None:
+        table = board.window_table(size)
+        grid = board.Board(size)
+        windows = np.array([[x * size + y for x, y in map(grid.coords, cells)] for cells in table.windows],
+                           dtype=np.intp)
+        center = size // 2
+        bonus = np.array([(5 - max(abs(x - center), abs(y - center))) // 2
+                          for x in range(size) for y in range(size)], dtype=np.int32)
+        layout = _layouts[size] = windows, bonus
+    return layout
+
+
+def extract_features(boards, size):
+    """Feature counts for a batch of flat boards (n, size * size) of board.CODES values."""
+    windows, bonus = _layout(size)
+    n = len(boards)
+    columns = len(FEATURES) + 1
+    keys = boards[:, windows].astype(np.intp) @ (3 ** np.arange(5))
+    slots = WINDOW_COLUMNS[keys] + np.arange(n)[:, None] * columns
+    counts = np.bincount(slots.ravel(), minlength=n * columns).reshape(n, columns)
+    counts[:, FEATURES.index("center")] = (boards == board.CODES[AI]) @ bonus
+    return counts[:, :-1]
+
+
+def game_positions(record, min_ply=4):
+    """Boards after each move from min_ply on, and the outcome for the AI (1 win, 0.5 draw, 0 loss).
+
+    The last position of a won game is left out: search never evaluates it.
+    """
+    size = record.board_size
+    outcome = {AI: 1.0, PLAYER: 0.0, "draw": 0.5}.get(record.result)
+    moves = np.array([x * size + y for x, y in record.moves], dtype=np.intp)
+    if outcome is None or len(moves) <= min_ply:
+        return None
+    codes = np.where(np.arange(len(moves)) % 2 == 0, board.CODES[PLAYER], board.CODES[AI]).astype(np.uint8)
+    # Row i holds the moves up to and including i
+    boards = np.zeros((len(moves), size * size), dtype=np.uint8)
+    boards[:, moves] = np.tri(len(moves), dtype=np.uint8) * codes
+    end = len(moves) - 1 if record.result != "draw" else len(moves)
+    return boards[min_ply:end], outcome
+
+
+def iter_feature_chunks(directory, chunk_size=65536, min_ply=4):
+    """Yield (features, outcomes) arrays of up to chunk_size positions per board size, streaming the records."""
+    pending = {}
+    for _, _, record in annotate.iter_games(directory):
+        found = game_positions(record, min_ply)
+        if found is None:
+            continue
+        boards, outcome = found
+        batch = pending.setdefault(record.board_size, ([], []))
+        batch[0].append(boards)
+        batch[1].append(np.full(len(boards), outcome, dtype=np.float32))
+        if sum(len(b) for b in batch[0]) >= chunk_size:
+            del pending[record.board_size]
+            yield extract_features(np.concatenate(batch[0]), record.board_size), np.concatenate(batch[1])
+    for size, (boards, outcomes) in pending.items():
+        yield extract_features(np.concatenate(boards), size), np.concatenate(outcomes)
+
+
+class FeatureStore:
+    """Feature rows spooled to a file and read back in chunks, so memory use does not grow with the data.
+
+    Each row is the feature counts and the outcome (times two) as int16.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix=".features")
+            os.close(handle)
+            self.temporary = True
+        else:
+            self.temporary = False
+        self.path = path
+        self.rows = 0
+        self.columns = len(FEATURES) + 1
+        self._file = open(path, "wb")
+
+    def append(self, features, outcomes):
+        rows = np.empty((len(features), self.columns), dtype=np.int16)
+        rows[:, :-1] = features
+        rows[:, -1] = np.round(outcomes * 2)
+        self._file.write(rows.tobytes())
+        self.rows += len(rows)
+
+    def chunks(self, chunk_size=65536):
+        """Yield (features as float64, outcomes) chunks from the file."""
+        self._file.flush()
+        if not self.rows:
+            return
+        data = np.memmap(self.path, dtype=np.int16, mode="r", shape=(self.rows, self.columns))
+        for start in range(0, self.rows, chunk_size):
+            block = np.asarray(data[start:start + chunk_size], dtype=np.float64)
+            yield block[:, :-1], block[:, -1] / 2
+
+    def close(self):
+        self._file.close()
+        if self.temporary:
+            os.remove(self.path)
+
+
+def _sigmoid(scores, scale):
+    return 1.0 / (1.0 + np.exp(-np.clip(scores / scale, -50, 50)))
+
+
+def texel_loss(store, weights, scale, chunk_size=65536):
+    """Mean squared error between outcomes and sigmoid(evaluation / scale)."""
+    total = 0.0
+    for features, outcomes in store.chunks(chunk_size):
+        total += float(np.sum((outcomes - _sigmoid(features @ weights, scale)) ** 2))
+    return total / store.rows
+
+
+def fit_scale(store, weights, chunk_size=65536):
+    """The sigmoid scale under which weights best predict the outcomes (golden-section search on log scale)."""
+    low, high = np.log(10.0), np.log(100000.0)
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(30):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if texel_loss(store, weights, np.exp(a), chunk_size) < texel_loss(store, weights, np.exp(b), chunk_size):
+            high = b
+        else:
+            low = a
+    return float(np.exp((low + high) / 2))
+
+
+def tune(store, start=None, scale=None, epochs=300, rate=2.0, chunk_size=65536, log=None):
+    """Texel tuning: fit weights to minimize texel_loss with Adam, one full pass over the store per step.
+
+    Starts from start (default HARD_WEIGHTS). The scale is fitted to the
+    starting weights and then held fixed, so the tuned weights stay in the
+    same units. Returns (weights dict, scale, loss before, loss after).
+    """
+    start = dict(HARD_WEIGHTS, **(start or {}))
+    weights = np.array([start[f] for f in FEATURES], dtype=np.float64)
+    scale = scale or fit_scale(store, weights, chunk_size)
+    before = texel_loss(store, weights, scale, chunk_size)
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    for step in range(1, epochs + 1):
+        gradient = np.zeros_like(weights)
+        for features, outcomes in store.chunks(chunk_size):
+            p = _sigmoid(features @ weights, scale)
+            gradient += features.T @ ((p - outcomes) * p * (1 - p))
+        gradient *= 2 / (scale * store.rows)
+        m = 0.9 * m + 0.1 * gradient
+        v = 0.999 * v + 0.001 * gradient ** 2
+        weights -= rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-12)
+        if log and step % 50 == 0:
+            print(f"step {step}: loss {texel_loss(store, weights, scale, chunk_size):.5f}", file=log)
+    after = texel_loss(store, weights, scale, chunk_size)
+    return {f: int(round(w)) for f, w in zip(FEATURES, weights)}, scale, before, after
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Tune evaluate_hard's pattern weights on recorded games")
+    parser.add_argument("directory", help="record and .sgf files, as written with GOMOKU_RECORDS")
+    parser.add_argument("-o", "--output", default="tuned_profile.json",
+                        help="difficulty profile JSON to write, for GOMOKU_DIFFICULTY")
+    parser.add_argument("--level", default="Tuned", help="difficulty level the profile defines or overrides")
+    parser.add_argument("--evaluator", default="tuned", help="name of the tuned evaluator")
+    parser.add_argument("--features", help="keep the extracted features in this file instead of a temporary one")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="positions per NumPy batch")
+    parser.add_argument("--min-ply", type=int, default=4, help="skip positions before this many moves")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=2.0, help="Adam step size, in weight units")
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.features)
+    try:
+        start = time.perf_counter()
+        for features, outcomes in iter_feature_chunks(args.directory, args.chunk_size, args.min_ply):
+            store.append(features, outcomes)
+        elapsed = time.perf_counter() - start
+        print(f"{store.rows} positions in {elapsed:.1f}s ({store.rows / elapsed if elapsed else 0:.0f}/s)",
+              file=sys.stderr)
+        if not store.rows:
+            print("no finished games to tune on", file=sys.stderr)
+            return 1
+        weights, scale, before, after = tune(store, epochs=args.epochs, rate=args.rate,
+                                             chunk_size=args.chunk_size, log=sys.stderr)
+    finally:
+        store.close()
+    print(f"scale {scale:.0f}, loss {before:.5f} -> {after:.5f}", file=sys.stderr)
+    for feature in FEATURES:
+        print(f"  {feature:18} {HARD_WEIGHTS[feature]:6} -> {weights[feature]:6}", file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump({args.level: {"evaluator": args.evaluator, "weights": weights}}, f, indent=2)
+    print(f"Wrote {args.output}; run with GOMOKU_DIFFICULTY={args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())